@@ -4,41 +4,1493 @@ Ansible + Python Exercises - Solutions
 Complete solutions for all 20 exercises in ansible-python-exercises.md
 """
 
+import itertools
 import json
 import os
 import re
-import subprocess
 import sys
-from pathlib import Path
+from collections import namedtuple
 
-# Optional imports - install as needed
-try:
-    import yaml
-except ImportError:
-    yaml = None
-    print("Note: Install pyyaml for YAML exercises: pip install pyyaml")
+# Optional imports - install as needed. These are loaded lazily on first
+# use, so e.g. `validate` never pays for importing ansible_runner.
+class _OptionalModule:
+    """
+    Stand-in for an optional dependency that imports it on first use.
+
+    Attribute access imports the real module; truthiness reports whether
+    it is installed without importing it (``if not yaml: raise ...``).
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._available = None
+
+    def _load(self):
+        if self._module is None:
+            import importlib
+
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __bool__(self):
+        if self._available is None:
+            import importlib.util
+
+            self._available = (self._module is not None
+                               or importlib.util.find_spec(self._name) is not None)
+        return self._available
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<optional module {self._name!r} ({state})>"
+
+
+yaml = _OptionalModule("yaml")                      # pip install pyyaml
+jinja2 = _OptionalModule("jinja2")                  # pip install jinja2
+ansible_runner = _OptionalModule("ansible_runner")  # pip install ansible-runner
+numpy = _OptionalModule("numpy")                    # pip install numpy
+orjson = _OptionalModule("orjson")                  # pip install orjson
+
+
+def __getattr__(name):
+    # Names this module used to re-export from jinja2
+    if name in ("Environment", "FileSystemLoader", "Template"):
+        return getattr(jinja2, name) if jinja2 else None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# =============================================================================
+# Shared Helpers
+# =============================================================================
+
+class LRUCache:
+    """
+    Bounded least-recently-used cache with hit/miss counters.
+
+    Used for the memoized lookups below (host patterns, parsed files,
+    templates). Each entry has a weight (1 by default) and the oldest
+    entries are evicted once the total exceeds ``maxsize``, so callers
+    can bound by bytes instead of entry count. Safe to share between
+    threads.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        import threading
+        from collections import OrderedDict
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.weight = 0
+        self._data = OrderedDict()
+        self._weights = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, weight: int = 1):
+        with self._lock:
+            self.weight += weight - self._weights.get(key, 0)
+            self._data[key] = value
+            self._weights[key] = weight
+            self._data.move_to_end(key)
+            while self.weight > self.maxsize and len(self._data) > 1:
+                oldest, _ = self._data.popitem(last=False)
+                self.weight -= self._weights.pop(oldest)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self.weight -= self._weights.pop(key)
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._weights.clear()
+            self.hits = self.misses = self.weight = 0
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def info(self) -> dict:
+        """Return hit/miss counters and current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "weight": self.weight,
+            "maxsize": self.maxsize,
+        }
+
+
+def yaml_backend() -> str:
+    """Return 'libyaml' when the C loader/dumper are in use, else 'python'."""
+    if not yaml:
+        raise ImportError("pyyaml required: pip install pyyaml")
+    return 'libyaml' if hasattr(yaml, 'CSafeLoader') else 'python'
+
+
+def _safe_loader():
+    """Fastest available safe loader class (libyaml if compiled in)."""
+    return getattr(yaml, 'CSafeLoader', None) or yaml.SafeLoader
+
+
+def _safe_dumper():
+    """Fastest available safe dumper class (libyaml if compiled in)."""
+    return getattr(yaml, 'CSafeDumper', None) or yaml.SafeDumper
+
+
+def yaml_load(stream):
+    """
+    Parse a YAML document with the fastest available safe loader.
+
+    Equivalent to yaml.safe_load(), but uses CSafeLoader when pyyaml was
+    built against libyaml. All YAML reads in this module go through here.
+    """
+    if not yaml:
+        raise ImportError("pyyaml required: pip install pyyaml")
+    return yaml.load(stream, Loader=_safe_loader())
+
+
+def yaml_dump(data, stream=None, **kwargs):
+    """
+    Serialize data to YAML with the fastest available safe dumper.
+
+    Counterpart of yaml_load(); keyword arguments go to yaml.dump().
+    """
+    if not yaml:
+        raise ImportError("pyyaml required: pip install pyyaml")
+    return yaml.dump(data, stream, Dumper=_safe_dumper(), **kwargs)
+
+
+def _event_composer_class():
+    """
+    Build (once) a composer that turns recorded YAML events into objects.
+
+    PlayStream pulls raw events from the parser and hands this class one
+    top-level item's worth at a time, so only that item is ever composed.
+    Built lazily because pyyaml is optional.
+    """
+    global _EventComposer
+    if _EventComposer is None:
+        from collections import deque
+
+        class _EventComposer(yaml.composer.Composer,
+                             yaml.constructor.SafeConstructor,
+                             yaml.resolver.Resolver):
+            def __init__(self):
+                yaml.composer.Composer.__init__(self)
+                yaml.constructor.SafeConstructor.__init__(self)
+                yaml.resolver.Resolver.__init__(self)
+                self.events = deque()
+
+            def check_event(self, *choices):
+                if not self.events:
+                    return False
+                return not choices or isinstance(self.events[0], choices)
+
+            def peek_event(self):
+                return self.events[0]
+
+            def get_event(self):
+                return self.events.popleft()
+
+            def load(self, events):
+                self.events.extend(events)
+                return self.construct_document(self.compose_node(None, None))
+
+    return _EventComposer
+
+
+_EventComposer = None
+
+
+class PlayStream:
+    """
+    Read the top-level sequence of a YAML file one item at a time.
+
+    Only the play currently being yielded is held in memory, so peak usage
+    is bounded by the largest single play instead of the whole file. After
+    construction ``kind`` is 'sequence' (iterate for the items), 'empty'
+    (no document or null) or 'other' (``document`` holds the non-list
+    value). YAML errors surface lazily, while iterating.
+    """
+
+    def __init__(self, filepath: str):
+        if not yaml:
+            raise ImportError("pyyaml required: pip install pyyaml")
+
+        self._file = open(filepath, 'r')
+        try:
+            self._parser = _safe_loader()(self._file)
+            self._composer = _event_composer_class()()
+            self.document = None
+
+            self._parser.get_event()  # StreamStartEvent
+            if self._parser.check_event(yaml.StreamEndEvent):
+                self.kind = 'empty'
+                return
+            self._document_start = self._parser.get_event()
+            if self._parser.check_event(yaml.SequenceStartEvent):
+                self._parser.get_event()
+                self.kind = 'sequence'
+            else:
+                self.document = self._next_item()
+                self.kind = 'empty' if self.document is None else 'other'
+                self._end_document()
+        except BaseException:
+            self.close()
+            raise
+
+    def _next_item(self):
+        """Collect the events for one node and compose just that node."""
+        events = []
+        depth = 0
+        while True:
+            event = self._parser.get_event()
+            events.append(event)
+            if isinstance(event, (yaml.SequenceStartEvent, yaml.MappingStartEvent)):
+                depth += 1
+            elif isinstance(event, (yaml.SequenceEndEvent, yaml.MappingEndEvent)):
+                depth -= 1
+            if depth == 0:
+                return self._composer.load(events)
+
+    def _end_document(self):
+        self._parser.get_event()  # DocumentEndEvent
+        if not self._parser.check_event(yaml.StreamEndEvent):
+            # Same error yaml_load raises for multi-document files
+            event = self._parser.get_event()
+            raise yaml.composer.ComposerError(
+                "expected a single document in the stream",
+                self._document_start.start_mark,
+                "but found another document", event.start_mark)
+
+    def __iter__(self):
+        if self.kind != 'sequence':
+            return
+        while not self._parser.check_event(yaml.SequenceEndEvent):
+            yield self._next_item()
+        self._parser.get_event()
+        self._end_document()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_playbook(filepath: str, stream: bool = False):
+    """
+    Context manager yielding a playbook's top-level value.
+
+    Without stream the document comes from the shared DocumentCache (a
+    read-only view). With stream=True a top-level list is yielded as a
+    lazy PlayStream instead; other values are yielded as-is.
+    """
+    from contextlib import contextmanager
+
+    @contextmanager
+    def opened():
+        if not stream:
+            yield load_document(filepath)
+            return
+        with PlayStream(filepath) as plays:
+            yield plays if plays.kind == 'sequence' else plays.document
+
+    if not yaml:
+        raise ImportError("pyyaml required: pip install pyyaml")
+    return opened()
+
+
+def default_cache_dir() -> str:
+    """Cache root: $ANSIBLE_HELPER_CACHE_DIR, else $XDG_CACHE_HOME/ansible-helper."""
+    return os.environ.get("ANSIBLE_HELPER_CACHE_DIR") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+        "ansible-helper",
+    )
+
+
+_UMASK = None
+
+
+def _temp_file_for(path) -> tuple:
+    """
+    Create the temp file that will be renamed over path; returns (fd, tmp_path).
+
+    mkstemp creates files as 0600, so the temp file is given the mode the
+    target already has, or the mode open() would give a new file
+    (0666 minus the umask).
+    """
+    global _UMASK
+    import stat
+    import tempfile
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    try:
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            if _UMASK is None:
+                # The umask can only be read by setting it
+                _UMASK = os.umask(0o022)
+                os.umask(_UMASK)
+            mode = 0o666 & ~_UMASK
+        os.fchmod(fd, mode)
+    except BaseException:
+        os.close(fd)
+        os.unlink(tmp_path)
+        raise
+    return fd, tmp_path
+
+
+def _atomic_write(path, data: bytes):
+    """
+    Write a file so readers only ever see the old or the complete new
+    content: write to a temp file in the same directory, then rename.
+    """
+    fd, tmp_path = _temp_file_for(path)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class DiskParseCache:
+    """
+    Persistent cache of parsed YAML documents for cold CLI runs.
+
+    Entries are pickles stored under ``<directory>/parse/`` and named by a
+    hash of the file content plus the loader version (pyyaml version,
+    backend and cache format), so upgrading pyyaml never serves stale
+    trees. Writes are atomic renames, so parallel CI workers can share
+    one directory without locking; a damaged entry is treated as a miss.
+    Hits touch the entry's mtime, which prune() uses as last-used time.
+
+    If the directory cannot be created or written, the cache warns once
+    and turns itself off for the rest of the run; parsing carries on
+    without it.
+
+    Only point this at a directory you own: entries are unpickled.
+    """
+
+    FORMAT = 1
+
+    def __init__(self, directory: str = None):
+        self.directory = os.path.join(directory or default_cache_dir(), "parse")
+        self.hits = 0
+        self.misses = 0
+        self.disabled = False
+
+    def _disable(self, error: OSError):
+        if not self.disabled:
+            import warnings
+
+            self.disabled = True
+            warnings.warn(f"disk parse cache disabled: {error}", RuntimeWarning, stacklevel=3)
+
+    def _path(self, digest: str) -> str:
+        import hashlib
+
+        tag = f"pyyaml-{yaml.__version__}-{yaml_backend()}-{self.FORMAT}:{digest}"
+        key = hashlib.blake2b(tag.encode(), digest_size=20).hexdigest()
+        return os.path.join(self.directory, key[:2], key + ".pickle")
+
+    def get(self, digest: str):
+        """Return (found, document) for a content digest."""
+        import pickle
+
+        if self.disabled:
+            return False, None
+        path = self._path(digest)
+        try:
+            with open(path, 'rb') as f:
+                document = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return False, None
+        except Exception:
+            # Truncated or incompatible entry: reparse and overwrite it
+            self.misses += 1
+            return False, None
+        try:
+            os.utime(path)
+        except OSError as e:
+            self._disable(e)
+        self.hits += 1
+        return True, document
+
+    def put(self, digest: str, document):
+        import pickle
+
+        if self.disabled:
+            return
+        path = self._path(digest)
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            _atomic_write(path, pickle.dumps(document, protocol=pickle.HIGHEST_PROTOCOL))
+        except OSError as e:
+            self._disable(e)
+
+    def prune(self, max_age_days: float = None, max_bytes: int = None) -> int:
+        """
+        Delete entries unused for max_age_days, then the least recently
+        used ones until the cache fits in max_bytes. Returns the number of
+        entries removed.
+        """
+        import time
+
+        entries = []
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+
+        doomed = []
+        if max_age_days is not None:
+            cutoff = time.time() - max_age_days * 86400
+            while entries and entries[0][0] < cutoff:
+                doomed.append(entries.pop(0))
+        if max_bytes is not None:
+            total = sum(size for _, size, _ in entries)
+            while entries and total > max_bytes:
+                entry = entries.pop(0)
+                total -= entry[1]
+                doomed.append(entry)
+
+        removed = 0
+        for _, _, path in doomed:
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass  # another worker got there first
+        return removed
+
+    def info(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "directory": self.directory,
+                "disabled": self.disabled}
+
+
+class ReadOnlyDict(dict):
+    """dict that refuses modification; deepcopy() returns a plain dict."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("cached YAML documents are read-only; deepcopy() to modify")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+class ReadOnlyList(list):
+    """list that refuses modification; deepcopy() returns a plain list."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("cached YAML documents are read-only; deepcopy() to modify")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+def freeze(data, _memo=None):
+    """Return a read-only view of a parsed YAML tree (aliases stay shared)."""
+    if _memo is None:
+        _memo = {}
+    if isinstance(data, (dict, list)) and id(data) in _memo:
+        return _memo[id(data)]
+
+    if isinstance(data, dict):
+        frozen = _memo[id(data)] = ReadOnlyDict()
+        dict.update(frozen, ((k, freeze(v, _memo)) for k, v in data.items()))
+        return frozen
+    if isinstance(data, list):
+        frozen = _memo[id(data)] = ReadOnlyList()
+        list.extend(frozen, (freeze(v, _memo) for v in data))
+        return frozen
+    return data
+
+
+class DocumentCache:
+    """
+    Process-wide cache of parsed YAML files.
+
+    Entries are keyed on the file's real path and validated against its
+    (mtime, size) on every lookup; with verify_hash=True the content hash
+    is compared as well, which catches edits that keep mtime and size.
+    Memory is bounded by the total source bytes of cached files, oldest
+    evicted first. Documents are handed out as read-only views so one
+    analysis cannot change what the next one sees. An optional
+    DiskParseCache backs memory misses across processes.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, verify_hash: bool = False,
+                 disk: DiskParseCache = None):
+        self.verify_hash = verify_hash
+        self.disk = disk
+        self._entries = LRUCache(maxsize=max_bytes)
+
+    def load(self, filepath: str):
+        """Return the parsed (read-only) document, parsing only if it changed."""
+        path = os.path.realpath(filepath)
+        st = os.stat(path)
+
+        entry = self._entries.get(path)
+        if entry is not None and entry[:2] == (st.st_mtime_ns, st.st_size):
+            if not self.verify_hash or entry[2] == self._digest(self._read(path)):
+                return entry[3]
+
+        import io
+
+        data = self._read(path)
+        digest = self._digest(data)
+        found, document = self.disk.get(digest) if self.disk else (False, None)
+        if not found:
+            stream = io.BytesIO(data)
+            stream.name = filepath  # keeps the file name in YAML error marks
+            document = yaml_load(stream)
+            if self.disk:
+                self.disk.put(digest, document)
 
-try:
-    from jinja2 import Environment, FileSystemLoader, Template
-except ImportError:
-    Environment = FileSystemLoader = Template = None
-    print("Note: Install jinja2 for template exercises: pip install jinja2")
+        document = freeze(document)
+        self._entries.put(
+            path,
+            (st.st_mtime_ns, st.st_size, digest, document),
+            weight=max(len(data), 1),
+        )
+        return document
+
+    @staticmethod
+    def _read(path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    @staticmethod
+    def _digest(data: bytes) -> str:
+        import hashlib
+
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def invalidate(self, filepath: str = None):
+        """Forget one file, or everything when no path is given."""
+        if filepath is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(os.path.realpath(filepath))
+
+    def info(self) -> dict:
+        return self._entries.info()
 
-try:
-    import ansible_runner
-except ImportError:
-    ansible_runner = None
-    print("Note: Install ansible-runner for execution exercises: pip install ansible-runner")
+
+_DOCUMENTS = DocumentCache()
+
+
+def load_document(filepath: str):
+    """Parse a YAML file through the shared DocumentCache (read-only result)."""
+    return _DOCUMENTS.load(filepath)
+
+
+def enable_disk_cache(directory: str = None) -> DiskParseCache:
+    """Back the shared DocumentCache with a persistent DiskParseCache."""
+    _DOCUMENTS.disk = DiskParseCache(directory)
+    return _DOCUMENTS.disk
+
+
+# =============================================================================
+# Playbook Analysis Engine
+# =============================================================================
+
+# Where a task sits: play index (0-based), 'tasks' or 'handlers', index in
+# its task list (0-based) and block nesting depth (0 = directly in the play)
+TaskContext = namedtuple("TaskContext", "play section index depth")
+
+_BLOCK_KEYS = ('block', 'rescue', 'always')
+
+
+class PlaybookAnalyzer:
+    """
+    Base class for analyzers driven by run_analyzers().
+
+    Override only the hooks you need. The engine walks the playbook once
+    and calls every registered analyzer at each node; node kinds nobody
+    listens to (e.g. every string) are not visited at all.
+    """
+
+    name = None
+
+    def begin(self, playbook):
+        """Called once with the top-level value before any play."""
+
+    def play(self, index, play):
+        """Called for every top-level item, in order."""
+
+    def task(self, task, ctx):
+        """Called for every task and handler, parents before their block children."""
+
+    def mapping(self, node):
+        """Called for every dict in the document."""
+
+    def string(self, value):
+        """Called for every string in the document, keys included."""
+
+    def result(self):
+        return None
+
+
+def _overrides(analyzers, hook):
+    base = getattr(PlaybookAnalyzer, hook)
+    return [getattr(a, hook) for a in analyzers if getattr(type(a), hook) is not base]
+
+
+def run_analyzers(playbook, analyzers: list) -> dict:
+    """
+    Walk a loaded (or streamed) playbook once, dispatching each node to the
+    analyzers' hooks. Returns {analyzer.name: analyzer.result()}.
+    """
+    on_begin = _overrides(analyzers, 'begin')
+    on_play = _overrides(analyzers, 'play')
+    on_task = _overrides(analyzers, 'task')
+    on_mapping = _overrides(analyzers, 'mapping')
+    on_string = _overrides(analyzers, 'string')
+    deep = bool(on_mapping or on_string)
+
+    def walk(node, skip=()):
+        if isinstance(node, dict):
+            for hook in on_mapping:
+                hook(node)
+            for key, value in node.items():
+                if isinstance(key, str):
+                    for hook in on_string:
+                        hook(key)
+                if key in skip and isinstance(value, list):
+                    continue  # walked as tasks by the caller
+                walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+        elif isinstance(node, str):
+            for hook in on_string:
+                hook(node)
+
+    def walk_tasks(tasks, play_index, section, depth):
+        for j, task in enumerate(tasks):
+            ctx = TaskContext(play_index, section, j, depth)
+            for hook in on_task:
+                hook(task, ctx)
+            if deep:
+                walk(task, _BLOCK_KEYS)
+            if isinstance(task, dict):
+                for key in _BLOCK_KEYS:
+                    if isinstance(task.get(key), list):
+                        walk_tasks(task[key], play_index, section, depth + 1)
+
+    for hook in on_begin:
+        hook(playbook)
+
+    if isinstance(playbook, (list, PlayStream)):
+        for i, play in enumerate(playbook):
+            for hook in on_play:
+                hook(i, play)
+            if deep:
+                walk(play, ('tasks', 'handlers') if isinstance(play, dict) else ())
+            if isinstance(play, dict):
+                for section in ('tasks', 'handlers'):
+                    if isinstance(play.get(section), list):
+                        walk_tasks(play[section], i, section, 0)
+    elif deep:
+        walk(playbook)
+
+    return {a.name: a.result() for a in analyzers}
+
+
+class ValidationAnalyzer(PlaybookAnalyzer):
+    """Structural checks behind ex04_yaml_validator."""
+
+    name = "errors"
+
+    def __init__(self):
+        self.errors = []
+        self.fatal = False  # top level unusable, no per-play checks ran
+
+    def begin(self, playbook):
+        if playbook is None:
+            self.errors.append("Empty playbook")
+            self.fatal = True
+        elif not isinstance(playbook, (list, PlayStream)):
+            self.errors.append("Playbook must be a list of plays")
+            self.fatal = True
+
+    def play(self, index, play):
+        if not isinstance(play, dict):
+            self.errors.append(f"Play {index+1}: Must be a dictionary")
+            return
+
+        # Check required keys
+        if 'hosts' not in play:
+            self.errors.append(f"Play {index+1}: Missing required 'hosts' key")
+
+        if 'tasks' not in play and 'roles' not in play:
+            self.errors.append(f"Play {index+1}: Must have 'tasks' or 'roles'")
+
+        if 'tasks' in play and not isinstance(play['tasks'], list):
+            self.errors.append(f"Play {index+1}: 'tasks' must be a list")
+
+    def task(self, task, ctx):
+        if ctx.section == 'tasks' and ctx.depth == 0 and not isinstance(task, dict):
+            self.errors.append(f"Play {ctx.play+1}, Task {ctx.index+1}: Must be a dictionary")
+
+    def result(self):
+        return self.errors
+
+
+class TaskStatsAnalyzer(PlaybookAnalyzer):
+    """Play/task/handler counts and modules used, behind ex09_task_counter."""
+
+    name = "stats"
+
+    # Known Ansible keywords (not modules)
+    KEYWORDS = {
+        'name', 'hosts', 'vars', 'vars_files', 'tasks', 'handlers',
+        'roles', 'become', 'become_user', 'gather_facts', 'when',
+        'register', 'notify', 'tags', 'block', 'rescue', 'always',
+        'loop', 'with_items', 'include_tasks', 'import_tasks',
+        'include_role', 'import_role', 'environment', 'ignore_errors'
+    }
+
+    def __init__(self):
+        self.stats = {"plays": 0, "tasks": 0, "handlers": 0, "modules": set()}
+
+    def play(self, index, play):
+        self.stats["plays"] += 1
+
+    def task(self, task, ctx):
+        if not isinstance(task, dict):
+            return
+        # A block wrapper is not a task itself; its children are counted
+        if 'block' not in task:
+            self.stats[ctx.section] += 1
+        # Find module (first key that's not a keyword)
+        for key in task:
+            if key not in self.KEYWORDS:
+                self.stats["modules"].add(key)
+                break
+
+    def result(self):
+        return {**self.stats, "modules": sorted(self.stats["modules"])}
+
+
+# Find all {{ variable }} patterns (fallback when jinja2 cannot parse)
+_VARIABLE_PATTERN = re.compile(r'\{\{\s*([\w\.]+)(?:\s*\|[^}]*)?\s*\}\}')
+
+_TEMPLATE_VARIABLES = LRUCache(maxsize=16384)
+_SCAN_ENV = None
+
+
+def _scan_template(value: str) -> frozenset:
+    global _SCAN_ENV
+
+    if jinja2:
+        from jinja2 import meta, nodes
+
+        if _SCAN_ENV is None:
+            _SCAN_ENV = jinja2.Environment()
+        try:
+            ast = _SCAN_ENV.parse(value)
+        except jinja2.TemplateSyntaxError:
+            pass
+        else:
+            # lookup(...), query(...) and friends are functions, not variables
+            callees = {id(call.node) for call in ast.find_all(nodes.Call)}
+            loaded = {node.name for node in ast.find_all(nodes.Name)
+                      if node.ctx == 'load' and id(node) not in callees}
+            return frozenset(meta.find_undeclared_variables(ast) & loaded)
+
+    return frozenset(match.split('.')[0] for match in _VARIABLE_PATTERN.findall(value))
+
+
+def template_variables(value: str) -> frozenset:
+    """
+    Return the variables a templated string reads, by base name.
+
+    The string is parsed with Jinja2, so references inside {% %} blocks
+    and filter arguments count, while loop variables and {% set %} names
+    do not. Results are cached per string since playbooks repeat the same
+    expressions a lot. Strings Jinja2 cannot parse (or a missing jinja2)
+    fall back to matching {{ name }} with a regex.
+    """
+    names = _TEMPLATE_VARIABLES.get(value)
+    if names is None:
+        names = _scan_template(value)
+        _TEMPLATE_VARIABLES.put(value, names)
+    return names
+
+
+class VariableAnalyzer(PlaybookAnalyzer):
+    """Variable references vs. vars: definitions, behind ex10_var_extractor."""
+
+    name = "variables"
+
+    PATTERN = _VARIABLE_PATTERN
+
+    # Built-in variables
+    BUILTINS = {'item', 'ansible_hostname', 'ansible_os_family',
+                'inventory_hostname', 'hostvars', 'groups', 'group_names'}
+
+    def __init__(self):
+        self.variables = set()
+        self.defined = set()
+
+    def string(self, value):
+        if '{{' in value or '{%' in value:
+            self.variables.update(template_variables(value))
+
+    def mapping(self, node):
+        if isinstance(node.get('vars'), dict):
+            self.defined.update(node['vars'].keys())
+
+    def result(self):
+        return {
+            "all_variables": sorted(self.variables),
+            "defined": sorted(self.defined),
+            "undefined": sorted(self.variables - self.defined - self.BUILTINS),
+            "builtin": sorted(self.variables & self.BUILTINS)
+        }
+
+
+class DefinitionAnalyzer(PlaybookAnalyzer):
+    """
+    Variables a playbook or task file defines: vars: blocks, set_fact
+    keys and register names, plus the vars_files it pulls in.
+    """
+
+    name = "definitions"
+
+    # key=value arguments of the set_fact shorthand form
+    FREE_FORM = re.compile(r'(?:^|\s)(\w+)=')
+
+    def __init__(self):
+        self.names = set()
+        self.vars_files = []
+
+    def mapping(self, node):
+        if isinstance(node.get('vars'), dict):
+            self.names.update(k for k in node['vars'] if isinstance(k, str))
+        if isinstance(node.get('register'), str):
+            self.names.add(node['register'])
+        for key in ('set_fact', 'ansible.builtin.set_fact'):
+            facts = node.get(key)
+            if isinstance(facts, dict):
+                self.names.update(k for k in facts if isinstance(k, str) and k != 'cacheable')
+            elif isinstance(facts, str):
+                self.names.update(n for n in self.FREE_FORM.findall(facts) if n != 'cacheable')
+        vars_files = node.get('vars_files')
+        if isinstance(vars_files, list):
+            for entry in vars_files:
+                # An entry may be a list of alternatives; any of them counts
+                for path in entry if isinstance(entry, list) else [entry]:
+                    if isinstance(path, str):
+                        self.vars_files.append(path)
+
+    def result(self):
+        return {"names": sorted(self.names), "vars_files": self.vars_files}
+
+
+class LintRule:
+    """
+    One linter check, run on a single task.
+
+    ``keys`` lists the task keys (usually module names) the rule cares
+    about; the rule only runs on tasks containing at least one of them.
+    Leave it as None for rules that apply to every task.
+    """
+
+    keys = None
+
+    def check(self, task: dict) -> list:
+        """Return warning messages for the task (without the task prefix)."""
+        return []
+
+
+class MissingNameRule(LintRule):
+    def check(self, task):
+        if 'name' not in task:
+            return ["Missing 'name' field"]
+        return []
+
+
+class ShellInsteadOfCommandRule(LintRule):
+    keys = ('shell',)
+
+    def check(self, task):
+        shell_cmd = task['shell']
+        if isinstance(shell_cmd, str) and '|' not in shell_cmd and '>' not in shell_cmd:
+            return ["Consider using 'command' instead of 'shell'"]
+        return []
+
+
+class HardcodedPasswordRule(LintRule):
+    """
+    Flags password-looking assignments anywhere in the task, including
+    nested block tasks. Walks keys and values directly rather than
+    searching str(task): a key ending in 'password' with a plain scalar
+    value, or 'password=...' / 'password: ...' inside any string.
+    """
+
+    TEXT = re.compile(r'password["\']?\s*[:=]\s*["\']?\w+', re.I)
+    WORD_START = re.compile(r'\w')
+
+    def check(self, task):
+        if self._scan(task):
+            return ["Possible hardcoded password detected"]
+        return []
+
+    def _scan(self, node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if isinstance(key, str):
+                    if self.TEXT.search(key):
+                        return True
+                    if key[-8:].lower() == 'password' and self._is_plain(value):
+                        return True
+                if self._scan(value):
+                    return True
+        elif isinstance(node, list):
+            return any(self._scan(item) for item in node)
+        elif isinstance(node, str):
+            return self.TEXT.search(node) is not None
+        return False
+
+    def _is_plain(self, value):
+        if isinstance(value, str):
+            return self.WORD_START.match(value) is not None
+        if isinstance(value, (dict, list)):
+            return False
+        return self.WORD_START.match(repr(value)) is not None  # numbers, booleans, null
+
+
+class PrivilegedModuleRule(LintRule):
+    keys = ('apt', 'yum', 'dnf', 'package', 'service', 'systemd', 'user', 'group')
+
+    def check(self, task):
+        if 'become' in task:
+            return []
+        return [f"'{mod}' module may require 'become: true'" for mod in self.keys if mod in task]
+
+
+# Rules run by ex13_playbook_linter, in reporting order. Append instances
+# of your own LintRule subclasses to extend the linter.
+LINT_RULES = [
+    MissingNameRule(),
+    ShellInsteadOfCommandRule(),
+    HardcodedPasswordRule(),
+    PrivilegedModuleRule(),
+]
+
+
+class LintAnalyzer(PlaybookAnalyzer):
+    """
+    Runs lint rules over play tasks, behind ex13_playbook_linter.
+
+    Rules are indexed by the keys they declare, so for each task only the
+    catch-all rules plus those keyed on one of the task's keys are run.
+    """
+
+    name = "warnings"
+
+    def __init__(self, rules: list = None):
+        self.rules = list(LINT_RULES if rules is None else rules)
+        self.warnings = []
+        self._always = []
+        self._by_key = {}
+        for position, rule in enumerate(self.rules):
+            if rule.keys is None:
+                self._always.append(position)
+            else:
+                for key in rule.keys:
+                    self._by_key.setdefault(key, []).append(position)
+
+    def check_task(self, task: dict) -> list:
+        """Return the warning messages for one task, in rule order."""
+        positions = self._always
+        keyed = [p for key in task if key in self._by_key for p in self._by_key[key]]
+        if keyed:
+            positions = sorted(set(positions).union(keyed))
+        messages = []
+        for position in positions:
+            messages.extend(self.rules[position].check(task))
+        return messages
+
+    def task(self, task, ctx):
+        if ctx.section != 'tasks' or not isinstance(task, dict):
+            return
+        task_id = f"Play {ctx.play+1}, Task {ctx.index+1}"
+        for message in self.check_task(task):
+            self.warnings.append(f"{task_id}: {message}")
+
+    def result(self):
+        return self.warnings
+
+
+def analyze_playbook(playbook_path: str, stream: bool = False, verbose: bool = True) -> dict:
+    """
+    Validate, count, extract variables and lint a playbook in one pass.
+
+    Returns {"valid", "errors", "stats", "variables", "warnings"} with the
+    same contents ex04, ex09, ex10 and ex13 report individually. If the
+    file is missing or not valid YAML only "valid" and "errors" are set.
+    """
+    if not yaml:
+        raise ImportError("pyyaml required: pip install pyyaml")
+
+    result = {"valid": False, "errors": [], "stats": None, "variables": None, "warnings": None}
+    if not os.path.exists(playbook_path):
+        result["errors"] = [f"File not found: {playbook_path}"]
+        return result
+
+    analyzers = [ValidationAnalyzer(), TaskStatsAnalyzer(), VariableAnalyzer(), LintAnalyzer()]
+    try:
+        with open_playbook(playbook_path, stream) as playbook:
+            result.update(run_analyzers(playbook, analyzers))
+    except yaml.YAMLError as e:
+        result["errors"] = [f"Invalid YAML syntax: {e}"]
+        return result
+    result["valid"] = not result["errors"]
+
+    if verbose:
+        stats = result["stats"]
+        print(f"Playbook Analysis: {playbook_path}")
+        print("-" * 40)
+        print(f"  Valid: {'yes' if result['valid'] else 'no'}")
+        for error in result["errors"]:
+            print(f"    - {error}")
+        print(f"  Plays: {stats['plays']}  Tasks: {stats['tasks']}  Handlers: {stats['handlers']}")
+        print(f"  Potentially undefined: {', '.join(result['variables']['undefined']) or 'None'}")
+        print(f"  Lint warnings: {len(result['warnings'])}")
+        for w in result["warnings"]:
+            print(f"    ⚠ {w}")
+
+    return result
+
+
+def _fingerprint(node) -> bytes:
+    """Content hash of a parsed YAML subtree (key order and types matter)."""
+    import hashlib
+    import pickle
+
+    return hashlib.blake2b(pickle.dumps(node, protocol=5), digest_size=16).digest()
+
+
+class IncrementalChecker:
+    """
+    Validate and lint files incrementally across repeated runs.
+
+    Findings are cached per play, keyed on a fingerprint of the play's
+    content; lint findings are also cached per task. After an edit only
+    plays whose fingerprint changed are re-checked, and inside those only
+    changed tasks are re-linted. Findings are stored relative to their
+    play ("Play N" is filled in on output), so plays that merely moved are
+    reused too. Output is identical to ex04/ex13 full runs.
+    """
+
+    def __init__(self, max_plays: int = 50000, max_tasks: int = 500000,
+                 max_files: int = 1000):
+        self._plays = LRUCache(maxsize=max_plays)
+        self._tasks = LRUCache(maxsize=max_tasks)
+        self._last = LRUCache(maxsize=max_files)  # (kind, path) -> (document, findings)
+        self._rules = None
+        self._linter = None
+
+    def _document(self, kind, filepath):
+        document = load_document(filepath)
+        last = self._last.get((kind, filepath))
+        if last is not None and last[0] is document:
+            return document, last[1]  # file unchanged since the last run
+        return document, None
+
+    def validate(self, filepath: str) -> tuple:
+        """Return (fatal, errors) exactly as ValidationAnalyzer reports them."""
+        document, findings = self._document('validate', filepath)
+        if findings is None:
+            validator = ValidationAnalyzer()
+            if not isinstance(document, list):
+                run_analyzers(document, [validator])
+            else:
+                for i, play in enumerate(document):
+                    key = ('validate', _fingerprint(play))
+                    relative = self._plays.get(key)
+                    if relative is None:
+                        single = ValidationAnalyzer()
+                        run_analyzers([play], [single])
+                        relative = [e[len("Play 1"):] for e in single.errors]
+                        self._plays.put(key, relative)
+                    validator.errors.extend(f"Play {i+1}{e}" for e in relative)
+            findings = (validator.fatal, validator.errors)
+            self._last.put(('validate', filepath), (document, findings))
+        return findings[0], list(findings[1])
+
+    def lint(self, filepath: str) -> list:
+        """Return the warnings ex13_playbook_linter would report."""
+        if self._rules != [id(r) for r in LINT_RULES]:
+            # Rule set changed: cached findings no longer apply
+            self._rules = [id(r) for r in LINT_RULES]
+            self._linter = LintAnalyzer()
+            self._plays.clear()
+            self._tasks.clear()
+            self._last.clear()
+
+        document, findings = self._document('lint', filepath)
+        if findings is None:
+            findings = []
+            if isinstance(document, list):
+                for i, play in enumerate(document):
+                    key = ('lint', _fingerprint(play))
+                    relative = self._plays.get(key)
+                    if relative is None:
+                        relative = self._lint_play(play)
+                        self._plays.put(key, relative)
+                    findings.extend(f"Play {i+1}{w}" for w in relative)
+            self._last.put(('lint', filepath), (document, findings))
+        return list(findings)
+
+    def _lint_play(self, play) -> list:
+        """Lint one changed play, reusing cached findings of unchanged tasks."""
+        relative = []
+
+        def walk(tasks):
+            for j, task in enumerate(tasks):
+                if not isinstance(task, dict):
+                    continue
+                key = _fingerprint(task)
+                messages = self._tasks.get(key)
+                if messages is None:
+                    messages = self._linter.check_task(task)
+                    self._tasks.put(key, messages)
+                relative.extend(f", Task {j+1}: {m}" for m in messages)
+                for block_key in _BLOCK_KEYS:
+                    if isinstance(task.get(block_key), list):
+                        walk(task[block_key])
+
+        if isinstance(play, dict) and isinstance(play.get('tasks'), list):
+            walk(play['tasks'])
+        return relative
+
+    def info(self) -> dict:
+        return {"plays": self._plays.info(), "tasks": self._tasks.info(),
+                "files": self._last.info()}
+
+
+_INCREMENTAL = IncrementalChecker()
 
 
 # =============================================================================
 # Exercise 1: Parse YAML Inventory
 # =============================================================================
 
-def ex01_parse_inventory(filepath: str) -> dict:
+def inventory_fingerprint(inventory) -> str:
+    """Return a content hash of an inventory dict (key order matters)."""
+    import hashlib
+
+    blob = json.dumps(inventory, default=str).encode()
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+
+class CompiledInventory:
+    """
+    Inventory compiled once into an indexed form for repeated queries.
+
+    Host names are interned and numbered in first-seen order. Each group
+    keeps its direct members as an ``array('I')`` of host IDs in file
+    order; the matching int bitset (bit N set = host ID N is a member)
+    and transitive membership (a group plus all of its descendants) are
+    built on first use, so no query has to walk the YAML tree again.
+
+    Host and group variables are kept too; host_variables() merges them
+    the way Ansible does for templating.
+    """
+
+    def __init__(self, inventory: dict, version: str = None):
+        from array import array
+        from itertools import chain
+
+        # Identifies the inventory content; cached pattern results are
+        # keyed on it, so a changed inventory never sees stale results.
+        self.version = version or inventory_fingerprint(inventory)
+
+        self.groups = {}         # group -> array('I') of direct member IDs
+        self._group_bits = {}    # group -> bitset of direct members, on demand
+        self.children = {}       # group -> list of child group names
+        self.group_vars = {}     # group -> vars
+        self.group_depth = {"all": 0}  # group -> longest distance from all
+        self._host_entries = []  # every 'hosts' mapping/list, in file order
+        self._host_vars = None   # merged from _host_entries on first use
+        members = {}             # group -> hosts of its last definition
+
+        def compile_group(data, group, depth=0):
+            if depth > self.group_depth.get(group, -1):
+                self.group_depth[group] = depth
+            if not isinstance(data, dict):
+                return
+            if isinstance(data.get('vars'), dict):
+                self.group_vars.setdefault(group, {}).update(data['vars'])
+            if 'hosts' in data:
+                hosts = data['hosts'] or ()
+                self._host_entries.append(hosts)
+                # A group listed twice keeps its last definition
+                members[group] = hosts
+            if 'children' in data:
+                children = data['children'] or {}
+                self.children.setdefault(group, [])
+                for child_name, child_data in children.items():
+                    if child_name not in self.children[group]:
+                        self.children[group].append(child_name)
+                    compile_group(child_data, child_name, depth + 1)
+
+        compile_group((inventory or {}).get('all', inventory), "all")
+
+        # Host IDs follow first-seen order across every host entry
+        self.hosts = list(dict.fromkeys(chain.from_iterable(self._host_entries)))
+        self.host_ids = dict(zip(self.hosts, range(len(self.hosts))))
+        for group, hosts in members.items():
+            self.groups[group] = array('I', map(self.host_ids.__getitem__, hosts))
+        self.all_bits = (1 << len(self.hosts)) - 1
+        self._transitive = {}
+        self._term_cache = LRUCache(maxsize=4096)
+
+    @classmethod
+    def from_file(cls, filepath: str) -> "CompiledInventory":
+        """Load and compile a YAML inventory file."""
+        if not yaml:
+            raise ImportError("pyyaml required: pip install pyyaml")
+
+        with open(filepath, 'r') as f:
+            return cls(yaml_load(f))
+
+    @property
+    def host_vars(self) -> dict:
+        """Host name -> vars merged from all of that host's entries."""
+        if self._host_vars is None:
+            host_vars = {}
+            for hosts in self._host_entries:
+                if isinstance(hosts, dict):
+                    for host, entry in hosts.items():
+                        if isinstance(entry, dict):
+                            host_vars.setdefault(host, {}).update(entry)
+            self._host_vars = host_vars
+        return self._host_vars
+
+    def __len__(self):
+        return len(self.hosts)
+
+    def __contains__(self, host):
+        return host in self.host_ids
+
+    def group_names(self) -> list:
+        """Return every known group name, parents before children."""
+        names = dict.fromkeys(self.groups)
+        for parent, children in self.children.items():
+            names.setdefault(parent)
+            names.update(dict.fromkeys(children))
+        return list(names)
+
+    def group_bits(self, group: str) -> int:
+        """Return the bitset of a group's direct members (0 if unknown)."""
+        bits = self._group_bits.get(group)
+        if bits is None:
+            ids = self.groups.get(group, ())
+            buf = bytearray((len(self.hosts) + 7) // 8)
+            for host_id in ids:
+                buf[host_id >> 3] |= 1 << (host_id & 7)
+            bits = self._group_bits[group] = int.from_bytes(buf, 'little')
+        return bits
+
+    def transitive_bits(self, group: str) -> int:
+        """Return the bitset of hosts in a group or any of its descendants."""
+        if group == "all":
+            return self.all_bits
+
+        bits = self._transitive.get(group)
+        if bits is None:
+            bits = self._transitive[group] = 0  # guards against cycles
+            bits = self.group_bits(group)
+            for child in self.children.get(group, ()):
+                bits |= self.transitive_bits(child)
+            self._transitive[group] = bits
+        return bits
+
+    def host_groups(self, host: str) -> list:
+        """Return every group a host belongs to, directly or through children."""
+        host_id = self.host_ids.get(host)
+        if host_id is None:
+            return []
+        mask = 1 << host_id
+        return [g for g in self.group_names() if self.transitive_bits(g) & mask]
+
+    def host_variables(self, host: str) -> dict:
+        """
+        Return a host's merged variables, following Ansible's precedence:
+        group vars from shallowest to deepest group (ties by name), with
+        'all' first and the host's own vars last.
+        """
+        merged = dict(self.group_vars.get("all", {}))
+        groups = [g for g in self.host_groups(host) if g != "all"]
+        groups.sort(key=lambda g: (self.group_depth.get(g, 0), g))
+        for group in groups:
+            merged.update(self.group_vars.get(group, {}))
+        merged.update(self.host_vars.get(host, {}))
+        return merged
+
+    def iter_host_variables(self):
+        """
+        Yield (host, groups, vars) for every host, in host ID order.
+
+        Same merge as host_variables(), but group membership is resolved
+        once per group rather than once per host. groups excludes 'all'
+        and is in precedence order.
+        """
+        order = [g for g in self.group_names() if g != "all"]
+        order.sort(key=lambda g: (self.group_depth.get(g, 0), g))
+        memberships = [[] for _ in self.hosts]
+        for group in order:
+            for host in self.names(self.transitive_bits(group)):
+                memberships[self.host_ids[host]].append(group)
+
+        all_vars = self.group_vars.get("all", {})
+        for host, groups in zip(self.hosts, memberships):
+            merged = dict(all_vars)
+            for group in groups:
+                merged.update(self.group_vars.get(group, {}))
+            merged.update(self.host_vars.get(host, {}))
+            yield host, groups, merged
+
+    def match(self, term: str) -> int:
+        """
+        Resolve a single host pattern term to a bitset.
+
+        Terms are group names, host names, wildcards (web*), regexes
+        (~web\\d+), negations (!db*) and subscripts (webservers[0:2]).
+        Results are cached per term, so each wildcard or regex scans the
+        host list only once per compiled inventory.
+        """
+        bits = self._term_cache.get(term)
+        if bits is None:
+            bits = self._match_uncached(term)
+            self._term_cache.put(term, bits)
+        return bits
+
+    def _match_uncached(self, term: str) -> int:
+        if term.startswith('!'):
+            return self.all_bits & ~self.match(term[1:].strip())
+
+        if term == 'all':
+            return self.all_bits
+        if term in self.groups:
+            return self.group_bits(term)
+
+        # Regexes are never split into base + subscript
+        subscript = None if term.startswith('~') else _HOST_SUBSCRIPT.match(term)
+        if subscript and term not in self.host_ids:
+            base, index, start, end = subscript.groups()
+            if base in self.groups:
+                ids = self.groups[base]
+            else:
+                ids = [self.host_ids[h] for h in self.names(self.match(base))]
+            if index is not None:
+                index = int(index)
+                selected = [ids[index]] if -len(ids) <= index < len(ids) else []
+            else:
+                # Ansible subscripts include the end index
+                end = len(ids) - 1 if end in ('', '-1') else int(end)
+                selected = ids[int(start or 0):end + 1]
+            bits = 0
+            for host_id in selected:
+                bits |= 1 << host_id
+            return bits
+
+        if term.startswith('~') or '*' in term or '?' in term:
+            regex = _compile_host_term(term)
+            bits = 0
+            for host_id, host in enumerate(self.hosts):
+                if regex.match(host):
+                    bits |= 1 << host_id
+            return bits
+
+        if term in self.host_ids:
+            return 1 << self.host_ids[term]
+
+        return 0
+
+    def names(self, bits: int) -> list:
+        """Translate a bitset back into host names, in host ID order."""
+        names = []
+        offset = 0
+        for byte in bits.to_bytes((bits.bit_length() + 7) // 8, 'little'):
+            while byte:
+                low = byte & -byte
+                names.append(self.hosts[offset + low.bit_length() - 1])
+                byte ^= low
+            offset += 8
+        return names
+
+    def to_dict(self) -> dict:
+        """Return the group -> direct hosts mapping built by ex01."""
+        return {g: [self.hosts[i] for i in ids] for g, ids in self.groups.items()}
+
+    def to_script_json(self) -> dict:
+        """Return the inventory in the JSON shape of a dynamic inventory script."""
+        inventory = {}
+        for group in self.group_names():
+            entry = inventory[group] = {}
+            if group in self.groups:
+                entry["hosts"] = [self.hosts[i] for i in self.groups[group]]
+            if self.group_vars.get(group):
+                entry["vars"] = self.group_vars[group]
+            if self.children.get(group):
+                entry["children"] = list(self.children[group])
+        inventory["_meta"] = {"hostvars": {h: self.host_vars.get(h, {}) for h in self.hosts}}
+        return inventory
+
+
+def ex01_parse_inventory(filepath: str, verbose: bool = True) -> dict:
     """
     Parse an Ansible inventory file (YAML format) and return hosts/groups.
-    
+
     Example inventory.yml:
         all:
           children:
@@ -49,39 +1501,20 @@ def ex01_parse_inventory(filepath: str) -> dict:
             dbservers:
               hosts:
                 db1.example.com:
+
+    Use CompiledInventory.from_file() directly to keep the indexed form
+    around for repeated pattern queries (see ex15_pattern_matcher).
     """
-    if yaml is None:
-        raise ImportError("pyyaml required: pip install pyyaml")
-    
-    with open(filepath, 'r') as f:
-        inventory = yaml.safe_load(f)
-    
-    def extract_hosts(data, group_name="all"):
-        """Recursively extract hosts from inventory structure."""
-        results = {}
-        
-        if isinstance(data, dict):
-            # Check for hosts in this group
-            if 'hosts' in data:
-                results[group_name] = list(data['hosts'].keys())
-            
-            # Check for child groups
-            if 'children' in data:
-                for child_name, child_data in data['children'].items():
-                    results.update(extract_hosts(child_data, child_name))
-        
-        return results
-    
-    groups = extract_hosts(inventory.get('all', inventory))
-    
-    # Print results
-    print("Inventory Groups and Hosts:")
-    print("-" * 40)
-    for group, hosts in groups.items():
-        print(f"\n[{group}]")
-        for host in hosts:
-            print(f"  - {host}")
-    
+    groups = CompiledInventory.from_file(filepath).to_dict()
+
+    if verbose:
+        print("Inventory Groups and Hosts:")
+        print("-" * 40)
+        for group, hosts in groups.items():
+            print(f"\n[{group}]")
+            for host in hosts:
+                print(f"  - {host}")
+
     return groups
 
 
@@ -99,7 +1532,7 @@ def ex02_generate_playbook(
     """
     Generate an Ansible playbook YAML file from parameters.
     """
-    if yaml is None:
+    if not yaml:
         raise ImportError("pyyaml required: pip install pyyaml")
     
     if module_args is None:
@@ -120,21 +1553,118 @@ def ex02_generate_playbook(
     ]
     
     with open(output_file, 'w') as f:
-        yaml.dump(playbook, f, default_flow_style=False, sort_keys=False)
+        yaml_dump(playbook, f, default_flow_style=False, sort_keys=False)
     
     print(f"Playbook generated: {output_file}")
     return output_file
 
 
-# =============================================================================
-# Exercise 3: Jinja2 Template Rendering
-# =============================================================================
+# =============================================================================
+# Exercise 3: Jinja2 Template Rendering
+# =============================================================================
+
+class TemplateCache:
+    """
+    Compiled Jinja2 templates shared across render calls.
+
+    All templates come from one Environment (default settings, same as
+    jinja2.Template) and are kept in a bounded LRU keyed by a hash of the
+    source, so rendering the same template again skips compilation. With
+    a bytecode directory, compiled code is also stored on disk through
+    Jinja's FileSystemBytecodeCache and reused by later processes.
+    """
+
+    def __init__(self, maxsize: int = 256, bytecode_dir: str = None):
+        import threading
+
+        self.bytecode_dir = bytecode_dir
+        self._templates = LRUCache(maxsize=maxsize)
+        self._pending = {}  # source hash -> source, while compiling
+        self._env = None
+        # Compiling goes through _pending, so one thread compiles at a time
+        self._compile_lock = threading.Lock()
+
+    def environment(self):
+        if self._env is None:
+            if not jinja2:
+                raise ImportError("jinja2 required: pip install jinja2")
+            pending = self._pending
+
+            class _SourceLoader(jinja2.BaseLoader):
+                def get_source(self, environment, name):
+                    # Only the source being compiled is known; includes and
+                    # extends name other templates
+                    if name not in pending:
+                        raise jinja2.TemplateNotFound(name)
+                    return pending[name], None, lambda: True
+
+            bytecode_cache = None
+            if self.bytecode_dir:
+                os.makedirs(self.bytecode_dir, mode=0o700, exist_ok=True)
+                bytecode_cache = jinja2.FileSystemBytecodeCache(self.bytecode_dir)
+            # Our LRU is the template cache; Jinja's own would duplicate it
+            self._env = jinja2.Environment(
+                loader=_SourceLoader(), cache_size=0, bytecode_cache=bytecode_cache)
+        return self._env
+
+    def get(self, source: str):
+        """Return the compiled template for a source string."""
+        import hashlib
+
+        key = hashlib.sha1(source.encode()).hexdigest()
+        template = self._templates.get(key)
+        if template is None:
+            with self._compile_lock:
+                # Another thread may have compiled it while we waited
+                if key in self._templates:
+                    template = self._templates.get(key)
+                if template is None:
+                    env = self.environment()
+                    self._pending[key] = source
+                    try:
+                        template = env.get_template(key)
+                    finally:
+                        del self._pending[key]
+                    self._templates.put(key, template)
+        return template
+
+    def info(self) -> dict:
+        return self._templates.info()
+
+
+_TEMPLATES = TemplateCache()
+
+
+def enable_template_bytecode_cache(directory: str = None) -> TemplateCache:
+    """Store compiled template bytecode on disk (default: <cache dir>/jinja)."""
+    global _TEMPLATES
+    _TEMPLATES = TemplateCache(
+        maxsize=_TEMPLATES._templates.maxsize,
+        bytecode_dir=directory or os.path.join(default_cache_dir(), "jinja"),
+    )
+    return _TEMPLATES
+
+
+def ex03_render_batch(template_string: str, variables_list):
+    """
+    Render one template against many variable dicts, yielding each result.
+
+    The template is compiled once (see TemplateCache) and outputs are
+    produced lazily, so an iterable of 30k host dicts never needs to be
+    held in memory along with its 30k renderings.
+    """
+    template = _TEMPLATES.get(template_string)
+    for variables in variables_list:
+        yield template.render(**variables)
+
 
 def ex03_jinja_render(template_string: str = None, variables: dict = None) -> str:
     """
     Render a Jinja2 template with given variables.
+
+    Compiled templates are cached by source (see TemplateCache).
     """
-    if Template is None:
+    if not jinja2:
         raise ImportError("jinja2 required: pip install jinja2")
     
     if template_string is None:
@@ -152,7 +1682,7 @@ debug_mode: {{ debug | default('false') }}
             "env": "production"
         }
     
-    template = Template(template_string)
+    template = _TEMPLATES.get(template_string)
     rendered = template.render(**variables)
     
     print("Rendered template:")
@@ -162,60 +1692,161 @@ debug_mode: {{ debug | default('false') }}
     return rendered
 
 
+_RENDER_MANIFEST = ".render-manifest.json"
+
+
+def _render_host_shard(template_string: str, shard: list) -> list:
+    """
+    Render and write one shard of hosts. shard holds (host, vars, path)
+    tuples; returns (host, error) pairs, error being None on success.
+    """
+    template = _TEMPLATES.get(template_string)
+    results = []
+    for host, variables, path in shard:
+        try:
+            _atomic_write(path, template.render(**variables).encode())
+        except Exception as e:
+            results.append((host, f"{type(e).__name__}: {e}"))
+        else:
+            results.append((host, None))
+    return results
+
+
+def render_inventory(inventory_path: str, template_string: str, output_dir: str,
+                     suffix: str = ".conf", jobs: int = None, shard_size: int = 256,
+                     force: bool = False, verbose: bool = True) -> dict:
+    """
+    Render a template once per inventory host into <output_dir>/<host><suffix>.
+
+    Each host sees its merged group and host vars (see
+    CompiledInventory.host_variables) plus inventory_hostname and
+    group_names. Hosts are sharded over a process pool and every output
+    file is written atomically. A manifest of input hashes kept in
+    output_dir lets the next run skip hosts whose template and variables
+    are unchanged; force re-renders everything.
+
+    Returns counts of rendered, skipped and failed hosts, the failures,
+    elapsed seconds and throughput in hosts/s.
+    """
+    import hashlib
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+    from itertools import repeat
+
+    start = time.perf_counter()
+    inventory = CompiledInventory.from_file(inventory_path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest_path = os.path.join(output_dir, _RENDER_MANIFEST)
+    manifest = {}
+    if not force:
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+
+    template_hash = hashlib.sha1(template_string.encode()).hexdigest()
+    hashes = {}
+    pending = []
+    skipped = 0
+    for host, groups, variables in inventory.iter_host_variables():
+        variables["inventory_hostname"] = host
+        variables["group_names"] = sorted(groups)
+        digest = hashlib.blake2b(
+            (template_hash + json.dumps(variables, sort_keys=True, default=str)).encode(),
+            digest_size=16,
+        ).hexdigest()
+        hashes[host] = digest
+        path = os.path.join(output_dir, host.replace(os.sep, "_") + suffix)
+        if manifest.get(host) == digest and os.path.exists(path):
+            skipped += 1
+        else:
+            pending.append((host, variables, path))
+
+    shards = [pending[i:i + shard_size] for i in range(0, len(pending), shard_size)]
+    jobs = min(jobs or os.cpu_count() or 1, len(shards) or 1)
+    if jobs == 1:
+        results = map(_render_host_shard, repeat(template_string), shards)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=jobs)
+        results = pool.map(_render_host_shard, repeat(template_string), shards)
+
+    failures = {}
+    try:
+        for shard_results in results:
+            for host, error in shard_results:
+                if error is not None:
+                    failures[host] = error
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    # Failed hosts stay out of the manifest so the next run retries them
+    new_manifest = {h: d for h, d in hashes.items() if h not in failures}
+    _atomic_write(manifest_path, json.dumps(new_manifest, sort_keys=True).encode())
+
+    elapsed = time.perf_counter() - start
+    rendered = len(pending) - len(failures)
+    summary = {
+        "rendered": rendered,
+        "skipped": skipped,
+        "failed": len(failures),
+        "failures": failures,
+        "seconds": elapsed,
+        "hosts_per_second": len(hashes) / elapsed if elapsed else 0.0,
+    }
+
+    if verbose:
+        for host, error in list(failures.items())[:20]:
+            print(f"  {host}: {error}")
+        if len(failures) > 20:
+            print(f"  ... and {len(failures) - 20} more")
+        print(f"Rendered {rendered} host(s), skipped {skipped} unchanged, "
+              f"{len(failures)} failed in {elapsed:.2f}s "
+              f"({summary['hosts_per_second']:.0f} hosts/s)")
+
+    return summary
+
+
 # =============================================================================
 # Exercise 4: YAML Validator
 # =============================================================================
 
-def ex04_yaml_validator(filepath: str) -> tuple[bool, list]:
+def ex04_yaml_validator(filepath: str, stream: bool = False,
+                        incremental: bool = False) -> tuple[bool, list]:
     """
     Validate an Ansible playbook YAML file.
     Returns (is_valid, list of errors).
+
+    With stream=True plays are parsed and checked one at a time (see
+    PlayStream), keeping memory flat on very large generated playbooks.
+    With incremental=True only plays changed since the previous call are
+    re-checked (see IncrementalChecker).
     """
-    if yaml is None:
+    if not yaml:
         raise ImportError("pyyaml required: pip install pyyaml")
     
-    errors = []
-    
     # Check file exists
     if not os.path.exists(filepath):
         return False, [f"File not found: {filepath}"]
     
-    # Try to parse YAML
+    # Parse YAML and validate Ansible structure
     try:
-        with open(filepath, 'r') as f:
-            content = yaml.safe_load(f)
+        if incremental:
+            fatal, errors = _INCREMENTAL.validate(filepath)
+        else:
+            with open_playbook(filepath, stream) as content:
+                validator = ValidationAnalyzer()
+                run_analyzers(content, [validator])
+            fatal, errors = validator.fatal, validator.errors
     except yaml.YAMLError as e:
         return False, [f"Invalid YAML syntax: {e}"]
     
-    # Validate Ansible structure
-    if content is None:
-        return False, ["Empty playbook"]
-    
-    if not isinstance(content, list):
-        errors.append("Playbook must be a list of plays")
+    if fatal:
         return False, errors
     
-    for i, play in enumerate(content):
-        if not isinstance(play, dict):
-            errors.append(f"Play {i+1}: Must be a dictionary")
-            continue
-        
-        # Check required keys
-        if 'hosts' not in play:
-            errors.append(f"Play {i+1}: Missing required 'hosts' key")
-        
-        if 'tasks' not in play and 'roles' not in play:
-            errors.append(f"Play {i+1}: Must have 'tasks' or 'roles'")
-        
-        # Validate tasks
-        if 'tasks' in play:
-            if not isinstance(play['tasks'], list):
-                errors.append(f"Play {i+1}: 'tasks' must be a list")
-            else:
-                for j, task in enumerate(play['tasks']):
-                    if not isinstance(task, dict):
-                        errors.append(f"Play {i+1}, Task {j+1}: Must be a dictionary")
-    
     is_valid = len(errors) == 0
     
     if is_valid:
@@ -232,52 +1863,359 @@ def ex04_yaml_validator(filepath: str) -> tuple[bool, list]:
 # Exercise 5: Dynamic Inventory Script
 # =============================================================================
 
-def ex05_dynamic_inventory(args: list = None) -> str:
+_EXAMPLE_INVENTORY = {
+    "webservers": {
+        "hosts": ["web1.example.com", "web2.example.com"],
+        "vars": {
+            "http_port": 80,
+            "ansible_user": "deploy"
+        }
+    },
+    "dbservers": {
+        "hosts": ["db1.example.com"],
+        "vars": {
+            "db_port": 5432
+        }
+    },
+    "all": {
+        "children": ["webservers", "dbservers"]
+    },
+    "_meta": {
+        "hostvars": {
+            "web1.example.com": {"ansible_host": "192.168.1.10"},
+            "web2.example.com": {"ansible_host": "192.168.1.11"},
+            "db1.example.com": {"ansible_host": "192.168.1.20"}
+        }
+    }
+}
+
+
+def _dumps_compact(obj) -> bytes:
+    """
+    Serialize JSON without whitespace, with orjson when it is installed.
+
+    Both paths accept the same input: non-string keys become strings and
+    values JSON has no type for (e.g. dates from YAML) are written with str().
+    """
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+                            default=str)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, default=str).encode()
+
+
+class InventorySource:
+    """
+    Where ex05_dynamic_inventory gets its inventory from.
+
+    list_inventory() returns the full inventory in dynamic-script JSON
+    form (groups plus _meta.hostvars). host_vars() returns one host's
+    vars; sources with an ``indexed`` lookup answer it without building
+    the full inventory. fingerprint() is a cheap change token (e.g. file
+    mtime and size) that lets cached results be reused safely, or None
+    when changes cannot be detected and only the cache TTL applies.
+    """
+
+    key = None
+    indexed = False
+    cacheable = True
+
+    def list_inventory(self) -> dict:
+        raise NotImplementedError
+
+    def host_vars(self, host: str) -> dict:
+        return self.list_inventory().get("_meta", {}).get("hostvars", {}).get(host, {})
+
+    def fingerprint(self):
+        return None
+
+
+def _file_fingerprint(path: str) -> list:
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+class StaticInventorySource(InventorySource):
+    """A fixed inventory dict (by default the built-in example)."""
+
+    cacheable = False
+
+    def __init__(self, inventory: dict = None):
+        self.inventory = _EXAMPLE_INVENTORY if inventory is None else inventory
+        self.key = "static"
+
+    def list_inventory(self) -> dict:
+        return self.inventory
+
+
+class YamlInventorySource(InventorySource):
+    """A YAML inventory file, as read by ex01_parse_inventory."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.key = "yaml:" + os.path.abspath(path)
+
+    def list_inventory(self) -> dict:
+        return CompiledInventory.from_file(self.path).to_script_json()
+
+    def fingerprint(self):
+        return _file_fingerprint(self.path)
+
+
+class SqliteInventorySource(InventorySource):
+    """
+    An inventory kept in SQLite: hosts and groups with JSON vars, plus
+    group membership and child tables. Host lookups are single indexed
+    queries. create() builds such a database from dynamic-script JSON.
+    """
+
+    indexed = True
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS hosts (name TEXT PRIMARY KEY, vars TEXT NOT NULL DEFAULT '{}');
+        CREATE TABLE IF NOT EXISTS groups (name TEXT PRIMARY KEY, vars TEXT NOT NULL DEFAULT '{}');
+        CREATE TABLE IF NOT EXISTS group_hosts (group_name TEXT NOT NULL, host_name TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS group_children (parent TEXT NOT NULL, child TEXT NOT NULL);
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.key = "sqlite:" + os.path.abspath(path)
+
+    def _connect(self):
+        import sqlite3
+
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(self.path)
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    @classmethod
+    def create(cls, path: str, inventory: dict) -> "SqliteInventorySource":
+        import sqlite3
+
+        hostvars = inventory.get("_meta", {}).get("hostvars", {})
+        groups = {g: d or {} for g, d in inventory.items() if g != "_meta"}
+        db = sqlite3.connect(path)
+        try:
+            with db:
+                db.executescript(cls.SCHEMA)
+                db.executemany("INSERT OR REPLACE INTO hosts VALUES (?, ?)",
+                               ((h, _dumps_compact(v).decode()) for h, v in hostvars.items()))
+                db.executemany("INSERT OR REPLACE INTO groups VALUES (?, ?)",
+                               ((g, _dumps_compact(d.get("vars", {})).decode()) for g, d in groups.items()))
+                db.executemany("INSERT INTO group_hosts VALUES (?, ?)",
+                               ((g, h) for g, d in groups.items() for h in d.get("hosts", ())))
+                db.executemany("INSERT INTO group_children VALUES (?, ?)",
+                               ((g, c) for g, d in groups.items() for c in d.get("children", ())))
+        finally:
+            db.close()
+        return cls(path)
+
+    def list_inventory(self) -> dict:
+        db = self._connect()
+        try:
+            inventory = {}
+            for name, group_vars in db.execute("SELECT name, vars FROM groups ORDER BY rowid"):
+                inventory[name] = {"vars": json.loads(group_vars)} if group_vars != '{}' else {}
+            for group, host in db.execute("SELECT group_name, host_name FROM group_hosts ORDER BY rowid"):
+                inventory.setdefault(group, {}).setdefault("hosts", []).append(host)
+            for parent, child in db.execute("SELECT parent, child FROM group_children ORDER BY rowid"):
+                inventory.setdefault(parent, {}).setdefault("children", []).append(child)
+            inventory["_meta"] = {"hostvars": {
+                name: json.loads(host_vars)
+                for name, host_vars in db.execute("SELECT name, vars FROM hosts ORDER BY rowid")
+            }}
+            return inventory
+        finally:
+            db.close()
+
+    def host_vars(self, host: str) -> dict:
+        db = self._connect()
+        try:
+            row = db.execute("SELECT vars FROM hosts WHERE name = ?", (host,)).fetchone()
+        finally:
+            db.close()
+        return json.loads(row[0]) if row else {}
+
+    def fingerprint(self):
+        return _file_fingerprint(self.path)
+
+
+class HttpInventorySource(InventorySource):
+    """An HTTP endpoint serving dynamic-script JSON (e.g. a CMDB export)."""
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        self.url = url
+        self.timeout = timeout
+        self.key = "http:" + url
+
+    def list_inventory(self) -> dict:
+        import urllib.request
+
+        with urllib.request.urlopen(self.url, timeout=self.timeout) as response:
+            return json.load(response)
+
+
+def inventory_source(spec: str = None) -> InventorySource:
+    """
+    Build a source from a spec: yaml:PATH, sqlite:PATH, an http(s) URL,
+    or a path ending in .yml/.yaml/.db/.sqlite. With no spec, uses
+    $ANSIBLE_HELPER_INVENTORY_SOURCE (Ansible only passes --list/--host),
+    falling back to the built-in example inventory.
+    """
+    spec = spec or os.environ.get("ANSIBLE_HELPER_INVENTORY_SOURCE")
+    if not spec or spec == "static":
+        return StaticInventorySource()
+    if spec.startswith(("http://", "https://")):
+        return HttpInventorySource(spec)
+    kind, sep, path = spec.partition(":")
+    if sep and kind == "yaml":
+        return YamlInventorySource(path)
+    if sep and kind == "sqlite":
+        return SqliteInventorySource(path)
+    if spec.endswith((".yml", ".yaml")):
+        return YamlInventorySource(spec)
+    if spec.endswith((".db", ".sqlite", ".sqlite3")):
+        return SqliteInventorySource(spec)
+    raise ValueError(f"Unknown inventory source: {spec}")
+
+
+class InventoryResultCache:
+    """
+    On-disk cache of one source's --list output.
+
+    Keeps the serialized --list payload (served byte for byte, never
+    re-encoded) and a SQLite index of host vars for --host lookups,
+    under ``<cache dir>/dyninv/<source key hash>/``. An entry is fresh
+    for ``ttl`` seconds and only while the source's fingerprint is
+    unchanged. meta.json is written last, so a half-written refresh is
+    never taken as fresh.
+    """
+
+    def __init__(self, source: InventorySource, directory: str = None, ttl: float = 300):
+        import hashlib
+
+        key = hashlib.blake2b(source.key.encode(), digest_size=12).hexdigest()
+        self.source = source
+        self.ttl = ttl
+        self.directory = os.path.join(directory or default_cache_dir(), "dyninv", key)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def fresh(self) -> bool:
+        import time
+
+        try:
+            with open(self._path("meta.json"), 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if time.time() - meta.get("created", 0) > self.ttl:
+            return False
+        fingerprint = self.source.fingerprint()
+        return fingerprint is None or meta.get("fingerprint") == fingerprint
+
+    def list_payload(self):
+        try:
+            with open(self._path("list.json"), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def lookup(self, host: str):
+        """Return a host's vars from the index, or None if the index is missing."""
+        import sqlite3
+
+        try:
+            db = sqlite3.connect(f"file:{self._path('hostvars.sqlite')}?mode=ro", uri=True)
+        except sqlite3.Error:
+            return None
+        try:
+            row = db.execute("SELECT vars FROM hostvars WHERE name = ?", (host,)).fetchone()
+        except sqlite3.Error:
+            return None
+        finally:
+            db.close()
+        return json.loads(row[0]) if row else {}
+
+    def refresh(self) -> bytes:
+        """Rebuild the entry from the source; returns the --list payload."""
+        import sqlite3
+        import tempfile
+        import time
+
+        fingerprint = self.source.fingerprint()
+        inventory = self.source.list_inventory()
+        payload = _dumps_compact(inventory)
+
+        os.makedirs(self.directory, exist_ok=True)
+        _atomic_write(self._path("list.json"), payload)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        os.close(fd)
+        try:
+            db = sqlite3.connect(tmp_path)
+            with db:
+                db.execute("CREATE TABLE hostvars (name TEXT PRIMARY KEY, vars TEXT NOT NULL)")
+                db.executemany("INSERT OR REPLACE INTO hostvars VALUES (?, ?)",
+                               ((h, _dumps_compact(v).decode()) for h, v in
+                                inventory.get("_meta", {}).get("hostvars", {}).items()))
+            db.close()
+            os.replace(tmp_path, self._path("hostvars.sqlite"))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        meta = {"created": time.time(), "fingerprint": fingerprint, "source": self.source.key}
+        _atomic_write(self._path("meta.json"), json.dumps(meta).encode())
+        return payload
+
+
+def ex05_dynamic_inventory(args: list = None, source: InventorySource = None,
+                           cache_ttl: float = None, cache_dir: str = None) -> str:
     """
     Generate dynamic inventory JSON for Ansible.
     Supports --list and --host <hostname> arguments.
+
+    The inventory comes from an InventorySource (see inventory_source();
+    the built-in example by default). --list results are cached on disk
+    for cache_ttl seconds (default $ANSIBLE_HELPER_INVENTORY_TTL or 300)
+    and printed as compact JSON; --host is answered from the cache's
+    host index, or directly by sources with an indexed lookup.
     """
     if args is None:
         args = sys.argv[1:] if len(sys.argv) > 1 else ["--list"]
     
-    inventory = {
-        "webservers": {
-            "hosts": ["web1.example.com", "web2.example.com"],
-            "vars": {
-                "http_port": 80,
-                "ansible_user": "deploy"
-            }
-        },
-        "dbservers": {
-            "hosts": ["db1.example.com"],
-            "vars": {
-                "db_port": 5432
-            }
-        },
-        "all": {
-            "children": ["webservers", "dbservers"]
-        },
-        "_meta": {
-            "hostvars": {
-                "web1.example.com": {"ansible_host": "192.168.1.10"},
-                "web2.example.com": {"ansible_host": "192.168.1.11"},
-                "db1.example.com": {"ansible_host": "192.168.1.20"}
-            }
-        }
-    }
+    if source is None:
+        source = inventory_source()
+    if cache_ttl is None:
+        cache_ttl = float(os.environ.get("ANSIBLE_HELPER_INVENTORY_TTL", 300))
+    cache = InventoryResultCache(source, cache_dir, cache_ttl) \
+        if source.cacheable and cache_ttl > 0 else None
     
-    if "--list" in args:
-        output = json.dumps(inventory, indent=2)
-    elif "--host" in args:
+    if "--host" in args and "--list" not in args:
         try:
-            host_index = args.index("--host") + 1
-            hostname = args[host_index]
-            hostvars = inventory["_meta"]["hostvars"].get(hostname, {})
-            output = json.dumps(hostvars, indent=2)
-        except (IndexError, KeyError):
-            output = json.dumps({})
+            hostname = args[args.index("--host") + 1]
+        except IndexError:
+            hostvars = {}
+        else:
+            hostvars = None
+            if cache is not None and not source.indexed:
+                if not cache.fresh():
+                    cache.refresh()
+                hostvars = cache.lookup(hostname)
+            if hostvars is None:
+                hostvars = source.host_vars(hostname)
+        output = _dumps_compact(hostvars).decode()
     else:
-        output = json.dumps(inventory, indent=2)
+        payload = None
+        if cache is not None:
+            payload = cache.list_payload() if cache.fresh() else None
+            if payload is None:
+                payload = cache.refresh()
+        else:
+            payload = _dumps_compact(source.list_inventory())
+        output = payload.decode()
     
     print(output)
     return output
@@ -287,13 +2225,134 @@ def ex05_dynamic_inventory(args: list = None) -> str:
 # Exercise 6: Run Ansible Playbook from Python
 # =============================================================================
 
-def ex06_run_playbook(playbook_path: str, inventory_path: str = None) -> dict:
+# One playbook event, trimmed to what reports need. data is the error
+# message for failed/unreachable hosts and the recap for playbook_on_stats.
+RunEvent = namedtuple("RunEvent", "event play task host changed counter data")
+
+# Per-host recap counters, named as in ansible-runner's stats
+RUN_STATS = ("ok", "changed", "failures", "dark", "skipped", "ignored", "rescued")
+
+
+class PlaybookEventStream:
+    """
+    Run a playbook with ansible_runner.run_async() and iterate over its
+    events as they happen.
+
+    The runner thread hands events to the consumer through a bounded
+    queue, so a slow consumer pauses the run instead of letting events
+    pile up in memory; only per-task and per-host events are kept, as
+    RunEvent tuples without the module results. Once iteration ends,
+    status, rc and stats hold the run's outcome. Closing the stream early
+    (or leaving a ``with`` block) cancels the run.
+    """
+
+    # Host events and the recap counter each one feeds
+    HOST_EVENTS = {
+        "runner_on_ok": "ok",
+        "runner_on_failed": "failures",
+        "runner_on_unreachable": "dark",
+        "runner_on_skipped": "skipped",
+    }
+    EVENTS = set(HOST_EVENTS) | {"playbook_on_play_start", "playbook_on_task_start",
+                                 "playbook_on_stats"}
+
+    _DONE = object()
+
+    def __init__(self, playbook_path: str, inventory_path: str = None,
+                 maxsize: int = 1000, **runner_kwargs):
+        import queue
+
+        if not ansible_runner:
+            raise ImportError("ansible-runner required: pip install ansible-runner")
+
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._closed = False
+        self.status = None
+        self.rc = None
+        self.stats = None
+
+        runner_kwargs.update(
+            playbook=playbook_path,
+            inventory=inventory_path or "localhost,",
+            quiet=True,
+            event_handler=self._on_event,
+            finished_callback=lambda runner: self._put(self._DONE),
+            cancel_callback=lambda: self._closed,
+        )
+        self._thread, self._runner = ansible_runner.run_async(**runner_kwargs)
+
+    def _put(self, item):
+        import queue
+
+        while not self._closed:
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _on_event(self, event):
+        kind = event.get("event")
+        if kind in self.EVENTS:
+            data = event.get("event_data", {})
+            res = data.get("res") if isinstance(data.get("res"), dict) else {}
+            if kind == "playbook_on_stats":
+                extra = {k: data.get(k) or {} for k in RUN_STATS}
+            elif kind in ("runner_on_failed", "runner_on_unreachable"):
+                extra = res.get("msg")
+            else:
+                extra = None
+            if kind == "runner_on_failed" and data.get("ignore_errors"):
+                kind = "runner_on_failed_ignored"
+            self._put(RunEvent(kind, data.get("play"), data.get("task"), data.get("host"),
+                               bool(res.get("changed")), event.get("counter"), extra))
+        return True  # keep ansible-runner's own artifacts
+
+    def __iter__(self):
+        import queue
+
+        while not self._closed:
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if not self._thread.is_alive():
+                    break
+                continue
+            if item is self._DONE:
+                break
+            yield item
+
+        self._thread.join()
+        self.status = self._runner.status
+        self.rc = self._runner.rc
+        self.stats = self._runner.stats
+
+    def close(self):
+        self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def ex06_run_playbook(playbook_path: str, inventory_path: str = None,
+                      stream: bool = False, report_file: str = None) -> dict:
     """
     Execute an Ansible playbook using ansible-runner.
+
+    With stream=True, task and host results are printed as they happen
+    (see PlaybookEventStream) and, if report_file is given, a Markdown
+    report of per-host counts is kept up to date while the run goes on
+    (see IncrementalReport).
     """
-    if ansible_runner is None:
+    if not ansible_runner:
         raise ImportError("ansible-runner required: pip install ansible-runner")
     
+    if stream:
+        return _run_playbook_streaming(playbook_path, inventory_path, report_file)
+    
     kwargs = {"playbook": playbook_path}
     
     if inventory_path:
@@ -321,107 +2380,410 @@ def ex06_run_playbook(playbook_path: str, inventory_path: str = None) -> dict:
     return result
 
 
-# =============================================================================
-# Exercise 7: Host Facts Collector
-# =============================================================================
+def _run_playbook_streaming(playbook_path: str, inventory_path: str, report_file: str) -> dict:
+    report = IncrementalReport(report_file) if report_file else None
+    marks = {"ok": "ok", "failures": "FAILED", "dark": "UNREACHABLE", "skipped": "skipping"}
+
+    print(f"Playbook: {playbook_path}")
+    with PlaybookEventStream(playbook_path, inventory_path) as events:
+        for event in events:
+            if report is not None:
+                report.update(event)
+            if event.event == "playbook_on_play_start":
+                print(f"\nPLAY [{event.play}]")
+            elif event.event == "playbook_on_task_start":
+                print(f"\nTASK [{event.task}]")
+            elif event.host:
+                stat = PlaybookEventStream.HOST_EVENTS.get(event.event, "ignored")
+                mark = "changed" if stat == "ok" and event.changed else marks.get(stat, stat)
+                print(f"  {mark}: [{event.host}]" + (f" {event.data}" if event.data else ""))
+    
+    if report is not None:
+        report.write(status=events.status, rc=events.rc)
+    
+    print(f"\nStatus: {events.status}")
+    print(f"Return code: {events.rc}")
+    
+    return {"status": events.status, "rc": events.rc, "stats": events.stats}
+
+
+# =============================================================================
+# Exercise 7: Host Facts Collector
+# =============================================================================
+
+# Fact cache settings shared with the ansible.cfg written by ex19
+FACT_CACHE_DIR = "/tmp/ansible_facts"
+FACT_CACHE_TIMEOUT = 3600
+
+# Summary field -> fact, the facts ex07 reports
+FACT_SUMMARY_KEYS = {
+    "hostname": "ansible_hostname",
+    "os_family": "ansible_os_family",
+    "distribution": "ansible_distribution",
+    "distribution_version": "ansible_distribution_version",
+    "kernel": "ansible_kernel",
+    "architecture": "ansible_architecture",
+    "memory_mb": "ansible_memtotal_mb",
+    "processor_count": "ansible_processor_count",
+    "python_version": "ansible_python_version",
+}
+
+
+class FactCache:
+    """
+    Host facts on disk in the layout of Ansible's ``jsonfile`` cache
+    plugin: one JSON file per host, named after the host, in a single
+    directory. Entries older than ``timeout`` seconds (by file mtime)
+    count as missing, as they do for Ansible, so ansible-playbook runs
+    and this module share one cache.
+    """
+
+    def __init__(self, directory: str = FACT_CACHE_DIR, timeout: int = FACT_CACHE_TIMEOUT,
+                 prefix: str = ""):
+        self.directory = directory
+        self.timeout = timeout
+        self.prefix = prefix
+
+    def _path(self, host: str) -> str:
+        return os.path.join(self.directory, self.prefix + host)
+
+    def get(self, host: str):
+        """Return the cached facts for a host, or None if missing or expired."""
+        import time
+
+        path = self._path(host)
+        try:
+            if self.timeout and time.time() - os.stat(path).st_mtime > self.timeout:
+                return None
+            with open(path, 'r') as f:
+                facts = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return facts if isinstance(facts, dict) else None
+
+    def put(self, host: str, facts: dict):
+        """Merge facts into the host's entry (as a new gather would) and save it."""
+        os.makedirs(self.directory, exist_ok=True)
+        merged = self.get(host) or {}
+        merged.update(facts)
+        _atomic_write(self._path(host), json.dumps(merged, sort_keys=True, indent=4).encode())
+
+    def delete(self, host: str):
+        try:
+            os.unlink(self._path(host))
+        except FileNotFoundError:
+            pass
+
+
+def collect_facts(hosts: list, inventory: str = None, keys=None, forks: int = 50,
+                  cache: FactCache = None, refresh: bool = False,
+                  connect_timeout: int = 10, timeout: float = 60) -> tuple:
+    """
+    Gather facts for many hosts with a single `ansible -m setup` run.
+
+    Only ``keys`` (default: the facts in FACT_SUMMARY_KEYS) are requested
+    from the hosts, through setup's filter option, and at most ``forks``
+    hosts are contacted at once. Hosts whose cached facts are fresh and
+    include every key are not contacted at all unless ``refresh`` is set;
+    new results are written back to the cache as they arrive.
+
+    Without an inventory, Ansible's configured default inventory is used
+    (plus the implicit localhost, which uses the local connection). The
+    whole run is killed after ``timeout`` seconds; hosts without a result
+    by then are reported as timed out. Returns ({host: facts}, {host: error}).
+    """
+    import subprocess
+    import tempfile
+    import threading
+
+    keys = list(keys or FACT_SUMMARY_KEYS.values())
+    cache = cache if cache is not None else FactCache()
+
+    facts = {}
+    pending = []
+    for host in dict.fromkeys(hosts):
+        cached = None if refresh else cache.get(host)
+        if cached is not None and all(k in cached for k in keys):
+            facts[host] = {k: cached[k] for k in keys}
+        else:
+            pending.append(host)
+
+    failed = {}
+    if not pending:
+        return facts, failed
+
+    # "localhost" names the implicit localhost when no inventory lists it
+    cmd = ["ansible", "all:localhost", "-m", "setup", "-a", "filter=" + ",".join(keys),
+           "-f", str(forks), "-T", str(connect_timeout), "--one-line"]
+    if inventory:
+        cmd += ["-i", inventory]
+    elif pending == ["localhost"]:
+        cmd += ["-c", "local"]
+    with tempfile.NamedTemporaryFile('w', suffix=".limit") as limit:
+        # A limit file keeps the command line short for any host count
+        limit.write("\n".join(pending) + "\n")
+        limit.flush()
+        cmd += ["--limit", "@" + limit.name]
+
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            proc.kill()
+
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        try:
+            # One line per host: "host | SUCCESS => {...}", "host | FAILED! => {...}"
+            # or "host | UNREACHABLE!: message"
+            for line in proc.stdout:
+                host, sep, rest = line.partition(" | ")
+                if not sep:
+                    continue
+                if rest.startswith("UNREACHABLE!: "):
+                    failed[host] = rest[len("UNREACHABLE!: "):].strip()
+                    continue
+                status, _, payload = rest.partition(" => ")
+                if status.startswith("SUCCESS"):
+                    try:
+                        result = json.loads(payload)
+                    except json.JSONDecodeError:
+                        failed[host] = "Failed to parse facts JSON"
+                        continue
+                    host_facts = result.get("ansible_facts", result)
+                    cache.put(host, host_facts)
+                    facts[host] = {k: host_facts.get(k) for k in keys if k in host_facts}
+                else:
+                    try:
+                        failed[host] = json.loads(payload).get("msg", status.strip())
+                    except (json.JSONDecodeError, AttributeError):
+                        failed[host] = status.strip()
+        except BaseException:
+            proc.kill()
+            raise
+        finally:
+            timer.cancel()
+            proc.wait()
+
+    if timed_out.is_set():
+        error = f"timed out after {timeout}s"
+    else:
+        error = f"no result (ansible exited with {proc.returncode})"
+    for host in pending:
+        if host not in facts and host not in failed:
+            failed[host] = error
+    return facts, failed
+
+
+def ex07_facts_collector(host: str = "localhost", use_cache: bool = True) -> dict:
+    """
+    Collect Ansible facts for a host and extract key information.
+
+    Facts come from the shared FactCache when fresh (see collect_facts);
+    use_cache=False always asks the host.
+    """
+    try:
+        facts, failed = collect_facts([host], refresh=not use_cache)
+    except FileNotFoundError:
+        print("Ansible not found. Install with: pip install ansible")
+        return {}
+    
+    if host not in facts:
+        print(f"Failed to collect facts: {failed.get(host, 'no result')}")
+        return {}
+    
+    ansible_facts = facts[host]
+    
+    # Extract key info
+    info = {name: ansible_facts.get(key, "N/A") for name, key in FACT_SUMMARY_KEYS.items()}
+    
+    print("Host Facts:")
+    print("-" * 40)
+    for key, value in info.items():
+        print(f"  {key}: {value}")
+    
+    return info
+
+
+# =============================================================================
+# Exercise 8: Inventory Diff Tool
+# =============================================================================
+
+def _content_hash(value) -> str:
+    import hashlib
+
+    blob = json.dumps(value, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+
+class InventorySnapshot:
+    """
+    What an inventory diff needs from one inventory, in comparable form.
+
+    hosts maps each host to (direct groups, own vars) and groups maps
+    each group to (children, vars), with a content hash per entry so two
+    snapshots compare an unchanged host or group with one string check.
+    Snapshots are small enough to pickle and are cached per inventory
+    file (see load_inventory_snapshot), so an unchanged file is never
+    parsed again just to be diffed.
+    """
+
+    def __init__(self, hosts: dict, groups: dict, version: str = None):
+        self.hosts = hosts
+        self.groups = groups
+        self.version = version
+        self.host_hashes = {h: _content_hash(v) for h, v in hosts.items()}
+        self.group_hashes = {g: _content_hash(v) for g, v in groups.items()}
+
+    @classmethod
+    def from_inventory(cls, inventory: CompiledInventory) -> "InventorySnapshot":
+        member_of = {host: [] for host in inventory.hosts}
+        for group, ids in inventory.groups.items():
+            for host_id in ids:
+                member_of[inventory.hosts[host_id]].append(group)
+        hosts = {host: (tuple(sorted(set(groups))), inventory.host_vars.get(host, {}))
+                 for host, groups in member_of.items()}
+        groups = {group: (tuple(inventory.children.get(group, ())), inventory.group_vars.get(group, {}))
+                  for group in inventory.group_names()}
+        return cls(hosts, groups, inventory.version)
+
+
+def _snapshot_path(filepath: str, cache_dir: str = None) -> str:
+    import hashlib
+
+    key = hashlib.blake2b(os.path.abspath(filepath).encode(), digest_size=16).hexdigest()
+    return os.path.join(cache_dir or default_cache_dir(), "inventory", key + ".pickle")
+
+
+def _read_snapshot(filepath: str, cache_dir: str = None):
+    """Return (stat, snapshot) last saved for a file, or (None, None)."""
+    import pickle
+
+    try:
+        with open(_snapshot_path(filepath, cache_dir), 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+        return None, None
+
 
-def ex07_facts_collector(host: str = "localhost") -> dict:
+def _save_snapshot(filepath: str, stat, snapshot: InventorySnapshot, cache_dir: str = None):
+    import pickle
+
+    path = _snapshot_path(filepath, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _atomic_write(path, pickle.dumps((stat, snapshot), protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def load_inventory_snapshot(filepath: str, cache_dir: str = None) -> InventorySnapshot:
     """
-    Collect Ansible facts for a host and extract key information.
+    Return the snapshot of an inventory file, parsing it only if it has
+    changed (by mtime and size) since its snapshot was cached.
     """
-    cmd = [
-        "ansible", host, "-m", "setup",
-        "-c", "local" if host == "localhost" else "ssh",
-        "--one-line"
-    ]
-    
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=60
-        )
-        
-        # Parse the JSON output (after the "host | SUCCESS => " prefix)
-        output = result.stdout
-        json_start = output.find("{")
-        if json_start != -1:
-            facts_json = output[json_start:]
-            facts = json.loads(facts_json)
-            ansible_facts = facts.get("ansible_facts", facts)
-            
-            # Extract key info
-            info = {
-                "hostname": ansible_facts.get("ansible_hostname", "N/A"),
-                "os_family": ansible_facts.get("ansible_os_family", "N/A"),
-                "distribution": ansible_facts.get("ansible_distribution", "N/A"),
-                "distribution_version": ansible_facts.get("ansible_distribution_version", "N/A"),
-                "kernel": ansible_facts.get("ansible_kernel", "N/A"),
-                "architecture": ansible_facts.get("ansible_architecture", "N/A"),
-                "memory_mb": ansible_facts.get("ansible_memtotal_mb", "N/A"),
-                "processor_count": ansible_facts.get("ansible_processor_count", "N/A"),
-                "python_version": ansible_facts.get("ansible_python_version", "N/A"),
-            }
-            
-            print("Host Facts:")
-            print("-" * 40)
-            for key, value in info.items():
-                print(f"  {key}: {value}")
-            
-            return info
-    except subprocess.TimeoutExpired:
-        print("Timeout collecting facts")
-    except json.JSONDecodeError:
-        print("Failed to parse facts JSON")
-    except FileNotFoundError:
-        print("Ansible not found. Install with: pip install ansible")
-    
-    return {}
+    st = os.stat(filepath)
+    stat = (st.st_mtime_ns, st.st_size)
+    cached_stat, snapshot = _read_snapshot(filepath, cache_dir)
+    if snapshot is None or cached_stat != stat:
+        snapshot = InventorySnapshot.from_inventory(CompiledInventory.from_file(filepath))
+        _save_snapshot(filepath, stat, snapshot, cache_dir)
+    return snapshot
 
 
-# =============================================================================
-# Exercise 8: Inventory Diff Tool
-# =============================================================================
+# One inventory difference. kind is host_added, host_removed,
+# host_changed, group_added, group_removed or group_changed; detail
+# describes a change (see _entry_changes) and is None otherwise.
+DiffEntry = namedtuple("DiffEntry", "kind name detail")
+
 
-def ex08_inventory_diff(file1: str, file2: str) -> dict:
+def _entry_changes(old: tuple, new: tuple, members: str) -> dict:
+    """Compare (members, vars) pairs of a host or group entry."""
+    old_members, old_vars = old
+    new_members, new_vars = new
+    changes = {}
+    if old_members != new_members:
+        changes[f"{members}_added"] = sorted(set(new_members) - set(old_members))
+        changes[f"{members}_removed"] = sorted(set(old_members) - set(new_members))
+    if old_vars != new_vars:
+        changes["vars_added"] = {k: new_vars[k] for k in sorted(new_vars) if k not in old_vars}
+        changes["vars_removed"] = sorted(k for k in old_vars if k not in new_vars)
+        changes["vars_changed"] = {k: (old_vars[k], new_vars[k]) for k in sorted(new_vars)
+                                   if k in old_vars and old_vars[k] != new_vars[k]}
+    return {k: v for k, v in changes.items() if v}
+
+
+def iter_inventory_diff(old: InventorySnapshot, new: InventorySnapshot):
+    """
+    Yield DiffEntry items for every group, then every host, that was
+    added, removed or changed between two snapshots, sorted by name.
+    Entries whose content hashes match are skipped without looking at
+    their contents.
+    """
+    if old.version is not None and old.version == new.version:
+        return
+
+    for kind, old_hashes, new_hashes, old_data, new_data, members in (
+            ("group", old.group_hashes, new.group_hashes, old.groups, new.groups, "children"),
+            ("host", old.host_hashes, new.host_hashes, old.hosts, new.hosts, "groups")):
+        for name in sorted(old_hashes.keys() | new_hashes.keys()):
+            old_hash = old_hashes.get(name)
+            new_hash = new_hashes.get(name)
+            if old_hash == new_hash:
+                continue
+            if old_hash is None:
+                yield DiffEntry(f"{kind}_added", name, None)
+            elif new_hash is None:
+                yield DiffEntry(f"{kind}_removed", name, None)
+            else:
+                yield DiffEntry(f"{kind}_changed", name,
+                                _entry_changes(old_data[name], new_data[name], members))
+
+
+def ex08_inventory_diff(file1: str, file2: str = None, snapshot: bool = False,
+                        cache_dir: str = None) -> dict:
     """
     Compare two inventory files and report differences.
+
+    Besides added and removed hosts, reports hosts whose group membership
+    or host vars changed and groups whose children or vars changed, with
+    per-entry details. All lists are sorted.
+
+    With snapshot=True each file's InventorySnapshot is cached, so files
+    that have not changed since an earlier diff are not parsed again.
+    With no file2, file1 is compared against its snapshot from the
+    previous call (what changed since last time) and the snapshot is
+    then updated. For very large deltas, iterate iter_inventory_diff()
+    directly instead.
     """
-    if yaml is None:
+    if not yaml:
         raise ImportError("pyyaml required: pip install pyyaml")
     
-    def get_all_hosts(inv_data):
-        """Extract all hosts from inventory."""
-        hosts = set()
-        
-        def extract(data):
-            if isinstance(data, dict):
-                if 'hosts' in data:
-                    hosts.update(data['hosts'].keys() if isinstance(data['hosts'], dict) else data['hosts'])
-                for v in data.values():
-                    extract(v)
-            elif isinstance(data, list):
-                for item in data:
-                    extract(item)
-        
-        extract(inv_data)
-        return hosts
-    
-    # Load inventories
-    with open(file1, 'r') as f:
-        inv1 = yaml.safe_load(f)
-    with open(file2, 'r') as f:
-        inv2 = yaml.safe_load(f)
-    
-    hosts1 = get_all_hosts(inv1)
-    hosts2 = get_all_hosts(inv2)
+    if file2 is None:
+        _, old = _read_snapshot(file1, cache_dir)
+        new = load_inventory_snapshot(file1, cache_dir)
+        old = old or InventorySnapshot({}, {})
+    elif snapshot:
+        old = load_inventory_snapshot(file1, cache_dir)
+        new = load_inventory_snapshot(file2, cache_dir)
+    else:
+        old = InventorySnapshot.from_inventory(CompiledInventory.from_file(file1))
+        new = InventorySnapshot.from_inventory(CompiledInventory.from_file(file2))
     
     diff = {
-        "added": list(hosts2 - hosts1),
-        "removed": list(hosts1 - hosts2),
-        "unchanged": list(hosts1 & hosts2)
+        "added": [], "removed": [], "changed": [], "unchanged": [],
+        "groups": {"added": [], "removed": [], "changed": []},
+        "details": {"hosts": {}, "groups": {}},
     }
+    for entry in iter_inventory_diff(old, new):
+        kind, action = entry.kind.split("_")
+        if kind == "host":
+            diff[action].append(entry.name)
+        else:
+            diff["groups"][action].append(entry.name)
+        if entry.detail is not None:
+            diff["details"][kind + "s"][entry.name] = entry.detail
+    
+    touched = set(diff["changed"])
+    diff["unchanged"] = sorted(h for h in old.hosts if h in new.hosts and h not in touched)
     
     print("Inventory Diff:")
     print("-" * 40)
@@ -431,69 +2793,277 @@ def ex08_inventory_diff(file1: str, file2: str) -> dict:
     print(f"\nRemoved hosts ({len(diff['removed'])}):")
     for h in diff['removed']:
         print(f"  - {h}")
+    print(f"\nChanged hosts ({len(diff['changed'])}):")
+    for h in diff['changed']:
+        print(f"  ~ {h}: {', '.join(diff['details']['hosts'][h])}")
+    group_changes = diff["groups"]
+    if any(group_changes.values()):
+        print(f"\nGroups: {len(group_changes['added'])} added, "
+              f"{len(group_changes['removed'])} removed, {len(group_changes['changed'])} changed")
+        for action, mark in (("added", "+"), ("removed", "-"), ("changed", "~")):
+            for g in group_changes[action]:
+                print(f"  {mark} {g}")
     print(f"\nUnchanged hosts: {len(diff['unchanged'])}")
     
     return diff
 
 
+class InventorySnapshotStore:
+    """
+    Content-addressed history of inventory snapshots.
+
+    Every piece of a snapshot is stored once under the hash of its
+    content in ``<directory>/objects/``: one object per group (children
+    and vars), an index of group hashes, and hosts spread over a fixed
+    number of buckets by a hash of their name (each bucket holds its
+    hosts' groups and vars). A snapshot's root object lists the group
+    index and bucket hashes, forming a small Merkle tree. Unchanged
+    groups and buckets hash the same and are shared between snapshots,
+    so storage grows with the delta; diff() descends only into subtrees
+    whose hashes differ, so comparing costs time proportional to the
+    change. The last ``keep`` snapshots are retained.
+
+    The bucket count defaults to that of the latest stored snapshot (1024
+    for a new store). Snapshots with different bucket counts can still be
+    diffed, through a full iter_inventory_diff. Writers serialize on a
+    lock file (flock, where available), so concurrent ``snapshot`` runs
+    neither lose history entries nor delete each other's new objects.
+    """
+
+    FORMAT = 1
+    DEFAULT_BUCKETS = 1024
+
+    def __init__(self, directory: str = None, keep: int = 10, buckets: int = None):
+        self.directory = directory or os.path.join(default_cache_dir(), "snapshots")
+        self.keep = keep
+        self._objects = LRUCache(maxsize=4096)
+        os.makedirs(os.path.join(self.directory, "objects"), exist_ok=True)
+        self.history = self._read_history()
+        if buckets is None and self.history:
+            buckets = len(self._get(self.history[-1]["id"])["buckets"])
+        self.buckets = buckets or self.DEFAULT_BUCKETS
+
+    def _lock(self):
+        """Context manager holding the store's exclusive writer lock."""
+        from contextlib import contextmanager
+
+        @contextmanager
+        def locked():
+            with open(os.path.join(self.directory, "lock"), 'a') as f:
+                try:
+                    import fcntl
+                except ImportError:  # no flock (Windows): single writer only
+                    yield
+                    return
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+        return locked()
+
+    def _history_path(self) -> str:
+        return os.path.join(self.directory, "snapshots.json")
+
+    def _read_history(self) -> list:
+        try:
+            with open(self._history_path(), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "objects", digest[:2], digest[2:])
+
+    def _put(self, obj) -> str:
+        import hashlib
+        import zlib
+
+        data = json.dumps(obj, sort_keys=True, separators=(',', ':'), default=str).encode()
+        digest = hashlib.blake2b(data, digest_size=20).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _atomic_write(path, zlib.compress(data))
+        return digest
+
+    def _get(self, digest: str):
+        import zlib
+
+        obj = self._objects.get(digest)
+        if obj is None:
+            with open(self._object_path(digest), 'rb') as f:
+                obj = json.loads(zlib.decompress(f.read()))
+            self._objects.put(digest, obj)
+        return obj
+
+    def _bucket(self, host: str) -> int:
+        import hashlib
+
+        digest = hashlib.blake2b(host.encode(), digest_size=4).digest()
+        return int.from_bytes(digest, 'little') % self.buckets
+
+    def commit(self, snapshot: InventorySnapshot, label: str = None, source: dict = None) -> str:
+        """Store a snapshot; returns its ID (the root hash)."""
+        import time
+
+        buckets = [{} for _ in range(self.buckets)]
+        for host, data in snapshot.hosts.items():
+            buckets[self._bucket(host)][host] = list(data)
+
+        with self._lock():
+            # Objects are written under the lock so a concurrent prune
+            # cannot delete them before the history refers to them
+            group_index = {g: self._put(list(data)) for g, data in snapshot.groups.items()}
+            root = {
+                "format": self.FORMAT,
+                "version": snapshot.version,
+                "groups": self._put(group_index),
+                "buckets": [self._put(bucket) for bucket in buckets],
+            }
+            snapshot_id = self._put(root)
+
+            # Another process may have committed since we read the history
+            self.history = self._read_history()
+            self.history.append({"id": snapshot_id, "time": time.time(), "label": label,
+                                 "hosts": len(snapshot.hosts), "groups": len(snapshot.groups),
+                                 "source": source})
+            self._prune()
+        return snapshot_id
+
+    def commit_file(self, filepath: str, label: str = None) -> str:
+        """
+        Snapshot an inventory file. If the file is unchanged (by mtime and
+        size) since the latest snapshot taken from it, that snapshot's ID
+        is returned without parsing the file.
+        """
+        st = os.stat(filepath)
+        source = {"path": os.path.abspath(filepath), "stat": [st.st_mtime_ns, st.st_size]}
+        for entry in reversed(self.history):
+            if entry.get("source") and entry["source"]["path"] == source["path"]:
+                if entry["source"]["stat"] == source["stat"]:
+                    return entry["id"]
+                break
+        snapshot = InventorySnapshot.from_inventory(CompiledInventory.from_file(filepath))
+        return self.commit(snapshot, label or filepath, source)
+
+    def resolve(self, ref) -> str:
+        """Turn a snapshot ID, ID prefix or history index (-1 = latest) into an ID."""
+        if isinstance(ref, int):
+            return self.history[ref]["id"]
+        matches = {e["id"] for e in self.history if e["id"].startswith(ref)}
+        if len(matches) != 1:
+            raise KeyError(f"Unknown or ambiguous snapshot: {ref}")
+        return matches.pop()
+
+    def load(self, ref) -> InventorySnapshot:
+        """Rebuild a full InventorySnapshot from the store."""
+        root = self._get(self.resolve(ref))
+        groups = {g: tuple(self._get(h)) for g, h in self._get(root["groups"]).items()}
+        hosts = {}
+        for digest in root["buckets"]:
+            for host, (host_groups, host_vars) in self._get(digest).items():
+                hosts[host] = (tuple(host_groups), host_vars)
+        return InventorySnapshot(hosts, {g: (tuple(c), v) for g, (c, v) in groups.items()},
+                                 root["version"])
+
+    def diff(self, old_ref, new_ref):
+        """
+        Yield DiffEntry items (as iter_inventory_diff does) between two
+        stored snapshots, reading only the groups and host buckets whose
+        hashes differ.
+        """
+        old_root = self._get(self.resolve(old_ref))
+        new_root = self._get(self.resolve(new_ref))
+        if old_root == new_root:
+            return
+        if len(old_root["buckets"]) != len(new_root["buckets"]):
+            # Hosts were bucketed differently; subtree hashes don't line up
+            yield from iter_inventory_diff(self.load(old_ref), self.load(new_ref))
+            return
+
+        if old_root["groups"] != new_root["groups"]:
+            old_index = self._get(old_root["groups"])
+            new_index = self._get(new_root["groups"])
+            for group in sorted(old_index.keys() | new_index.keys()):
+                old_hash, new_hash = old_index.get(group), new_index.get(group)
+                if old_hash == new_hash:
+                    continue
+                if old_hash is None:
+                    yield DiffEntry("group_added", group, None)
+                elif new_hash is None:
+                    yield DiffEntry("group_removed", group, None)
+                else:
+                    yield DiffEntry("group_changed", group, _entry_changes(
+                        self._get(old_hash), self._get(new_hash), "children"))
+
+        entries = []
+        for old_hash, new_hash in zip(old_root["buckets"], new_root["buckets"]):
+            if old_hash == new_hash:
+                continue
+            old_bucket, new_bucket = self._get(old_hash), self._get(new_hash)
+            for host in old_bucket.keys() | new_bucket.keys():
+                old_data, new_data = old_bucket.get(host), new_bucket.get(host)
+                if old_data == new_data:
+                    continue
+                if old_data is None:
+                    entries.append(DiffEntry("host_added", host, None))
+                elif new_data is None:
+                    entries.append(DiffEntry("host_removed", host, None))
+                else:
+                    entries.append(DiffEntry("host_changed", host,
+                                             _entry_changes(old_data, new_data, "groups")))
+        entries.sort(key=lambda e: e.name)
+        yield from entries
+
+    def _prune(self):
+        """Keep the last ``keep`` snapshots and delete objects only the others used."""
+        dropped = self.history[:-self.keep] if self.keep else []
+        self.history = self.history[len(dropped):]
+        _atomic_write(self._history_path(), json.dumps(self.history).encode())
+        if not dropped:
+            return
+
+        live = set()
+        for entry in self.history:
+            root = self._get(entry["id"])
+            live.add(entry["id"])
+            live.add(root["groups"])
+            live.update(self._get(root["groups"]).values())
+            live.update(root["buckets"])
+
+        objects = os.path.join(self.directory, "objects")
+        for prefix in os.listdir(objects):
+            for name in os.listdir(os.path.join(objects, prefix)):
+                if prefix + name not in live and not name.startswith(".tmp-"):
+                    os.unlink(os.path.join(objects, prefix, name))
+        self._objects.clear()
+
+    def info(self) -> dict:
+        files = size = 0
+        for dirpath, _, filenames in os.walk(os.path.join(self.directory, "objects")):
+            for name in filenames:
+                files += 1
+                size += os.path.getsize(os.path.join(dirpath, name))
+        return {"snapshots": len(self.history), "objects": files, "bytes": size}
+
+
 # =============================================================================
 # Exercise 9: Playbook Task Counter
 # =============================================================================
 
-def ex09_task_counter(playbook_path: str) -> dict:
+def ex09_task_counter(playbook_path: str, stream: bool = False) -> dict:
     """
     Analyse playbook complexity - count tasks, handlers, modules used.
+
+    With stream=True plays are counted one at a time (see PlayStream).
     """
-    if yaml is None:
+    if not yaml:
         raise ImportError("pyyaml required: pip install pyyaml")
     
-    with open(playbook_path, 'r') as f:
-        playbook = yaml.safe_load(f)
-    
-    stats = {
-        "plays": 0,
-        "tasks": 0,
-        "handlers": 0,
-        "modules": set()
-    }
-    
-    # Known Ansible keywords (not modules)
-    keywords = {
-        'name', 'hosts', 'vars', 'vars_files', 'tasks', 'handlers',
-        'roles', 'become', 'become_user', 'gather_facts', 'when',
-        'register', 'notify', 'tags', 'block', 'rescue', 'always',
-        'loop', 'with_items', 'include_tasks', 'import_tasks',
-        'include_role', 'import_role', 'environment', 'ignore_errors'
-    }
-    
-    def count_tasks(tasks_list):
-        count = 0
-        for task in tasks_list:
-            if isinstance(task, dict):
-                count += 1
-                # Find module (first key that's not a keyword)
-                for key in task.keys():
-                    if key not in keywords:
-                        stats["modules"].add(key)
-                        break
-                # Handle blocks
-                if 'block' in task:
-                    count += count_tasks(task['block']) - 1
-                if 'rescue' in task:
-                    count += count_tasks(task['rescue'])
-                if 'always' in task:
-                    count += count_tasks(task['always'])
-        return count
-    
-    if isinstance(playbook, list):
-        stats["plays"] = len(playbook)
-        for play in playbook:
-            if 'tasks' in play:
-                stats["tasks"] += count_tasks(play['tasks'])
-            if 'handlers' in play:
-                stats["handlers"] += count_tasks(play['handlers'])
-    
-    stats["modules"] = sorted(stats["modules"])
+    with open_playbook(playbook_path, stream) as playbook:
+        stats = run_analyzers(playbook, [TaskStatsAnalyzer()])["stats"]
     
     print(f"Playbook Analysis: {playbook_path}")
     print("-" * 40)
@@ -509,60 +3079,168 @@ def ex09_task_counter(playbook_path: str) -> dict:
 # Exercise 10: Variable Extractor
 # =============================================================================
 
-def ex10_var_extractor(playbook_path: str) -> dict:
+class VariableIndex:
+    """
+    Where variables are defined across a repository.
+
+    Covers role defaults/ and vars/, group_vars/ and host_vars/ (any YAML
+    mapping under a directory with one of those names), vars: blocks,
+    set_fact and register in playbooks and task files, and files pulled
+    in through vars_files. Each file's contribution is stored with its
+    stat, so update() only re-parses files that changed. The index is
+    saved as JSON under ``<cache dir>/varindex/``.
+    """
+
+    FORMAT = 1
+    VAR_DIRS = {'group_vars', 'host_vars', 'defaults', 'vars'}
+    EXTENSIONS = ('.yml', '.yaml', '.json')
+
+    def __init__(self, root: str = ".", cache_dir: str = None):
+        import hashlib
+
+        self.root = os.path.abspath(root)
+        key = hashlib.blake2b(self.root.encode(), digest_size=10).hexdigest()
+        self.path = os.path.join(cache_dir or default_cache_dir(), "varindex", key + ".json")
+        self.files = {}   # relative path -> {"stat", "kind", "names", "refs"}
+        self._definitions = None
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("format") == self.FORMAT and data.get("root") == self.root:
+            self.files = data.get("files", {})
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {"format": self.FORMAT, "root": self.root, "files": self.files}
+        _atomic_write(self.path, json.dumps(data).encode())
+
+    def _candidates(self):
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+            rel_dir = os.path.relpath(dirpath, self.root)
+            parts = set() if rel_dir == '.' else set(rel_dir.split(os.sep))
+            in_inventory_vars = bool(parts & {'group_vars', 'host_vars'})
+            for name in sorted(filenames):
+                # group_vars/all and friends often have no extension
+                if name.endswith(self.EXTENSIONS) or (in_inventory_vars and '.' not in name):
+                    yield os.path.normpath(os.path.join(rel_dir, name))
+
+    def _scan(self, rel: str) -> dict:
+        try:
+            doc = load_document(os.path.join(self.root, rel))
+        except (OSError, ValueError, yaml.YAMLError):
+            return {"kind": "error", "names": [], "refs": []}
+
+        if isinstance(doc, dict):
+            in_var_dir = bool(set(rel.split(os.sep)[:-1]) & self.VAR_DIRS)
+            names = sorted(k for k in doc if isinstance(k, str))
+            # Other mappings only count when some vars_files points at them
+            return {"kind": "vars" if in_var_dir else "data", "names": names, "refs": []}
+
+        if isinstance(doc, list):
+            found = run_analyzers(doc, [DefinitionAnalyzer()])["definitions"]
+            base = os.path.dirname(rel)
+            refs = []
+            for ref in found["vars_files"]:
+                # Templated parts ("vars/{{ env }}.yml") become wildcards
+                ref = re.sub(r'\{\{.*?\}\}', '*', ref)
+                if os.path.isabs(ref):
+                    ref = os.path.relpath(ref, self.root)
+                refs.append(os.path.normpath(os.path.join(base, ref)))
+            return {"kind": "tasks", "names": found["names"], "refs": refs}
+
+        return {"kind": "other", "names": [], "refs": []}
+
+    def update(self) -> dict:
+        """
+        Bring the index up to date with the files on disk and save it.
+        Returns counts of files seen, re-parsed and dropped.
+        """
+        seen = set()
+        parsed = 0
+        for rel in self._candidates():
+            seen.add(rel)
+            try:
+                st = os.stat(os.path.join(self.root, rel))
+            except OSError:
+                continue
+            stat = [st.st_mtime_ns, st.st_size]
+            entry = self.files.get(rel)
+            if entry is None or entry["stat"] != stat:
+                entry = self._scan(rel)
+                entry["stat"] = stat
+                self.files[rel] = entry
+                parsed += 1
+
+        dropped = [rel for rel in self.files if rel not in seen]
+        for rel in dropped:
+            del self.files[rel]
+
+        if parsed or dropped:
+            self._definitions = None
+            self.save()
+        return {"files": len(seen), "parsed": parsed, "dropped": len(dropped)}
+
+    def definitions(self) -> dict:
+        """Return {variable name: [files defining it]}."""
+        import fnmatch
+
+        if self._definitions is None:
+            refs = set()
+            patterns = []
+            for entry in self.files.values():
+                for ref in entry["refs"]:
+                    if '*' in ref or '?' in ref:
+                        patterns.append(ref)
+                    else:
+                        refs.add(ref)
+
+            definitions = {}
+            for rel, entry in sorted(self.files.items()):
+                if entry["kind"] == "data" and rel not in refs and not any(
+                        fnmatch.fnmatchcase(rel, p) for p in patterns):
+                    continue
+                for name in entry["names"]:
+                    definitions.setdefault(name, []).append(rel)
+            self._definitions = definitions
+        return self._definitions
+
+    def __contains__(self, name):
+        return name in self.definitions()
+
+    def lookup(self, name: str) -> list:
+        """Return the files defining a variable (empty if none)."""
+        return self.definitions().get(name, [])
+
+
+def ex10_var_extractor(playbook_path: str, index: VariableIndex = None) -> dict:
     """
     Extract all variables from a playbook and check if they're defined.
+
+    With a VariableIndex, variables defined elsewhere in the repository
+    (roles, group_vars, host_vars, vars_files, set_fact, register) are
+    not reported as undefined; they are listed under "defined_elsewhere".
     """
-    if yaml is None:
+    if not yaml:
         raise ImportError("pyyaml required: pip install pyyaml")
     
-    with open(playbook_path, 'r') as f:
-        content = f.read()
-    
-    # Find all {{ variable }} patterns
-    pattern = r'\{\{\s*([\w\.]+)(?:\s*\|[^}]*)?\s*\}\}'
-    matches = re.findall(pattern, content)
-    
-    # Get unique variables (base name only)
-    variables = set()
-    for match in matches:
-        var_name = match.split('.')[0]  # Get base variable name
-        variables.add(var_name)
-    
-    # Parse YAML to find defined variables
-    playbook = yaml.safe_load(content)
-    defined_vars = set()
-    
-    def extract_defined(data):
-        if isinstance(data, dict):
-            if 'vars' in data:
-                defined_vars.update(data['vars'].keys())
-            for v in data.values():
-                extract_defined(v)
-        elif isinstance(data, list):
-            for item in data:
-                extract_defined(item)
-    
-    extract_defined(playbook)
-    
-    # Built-in variables
-    builtins = {'item', 'ansible_hostname', 'ansible_os_family', 
-                'inventory_hostname', 'hostvars', 'groups', 'group_names'}
-    
-    undefined = variables - defined_vars - builtins
-    
-    result = {
-        "all_variables": sorted(variables),
-        "defined": sorted(defined_vars),
-        "undefined": sorted(undefined),
-        "builtin": sorted(variables & builtins)
-    }
+    result = run_analyzers(load_document(playbook_path), [VariableAnalyzer()])["variables"]
+    if index is not None:
+        result["defined_elsewhere"] = [v for v in result["undefined"] if v in index]
+        result["undefined"] = [v for v in result["undefined"] if v not in index]
     
     print(f"Variable Analysis: {playbook_path}")
     print("-" * 40)
     print(f"Variables found: {', '.join(result['all_variables'])}")
     print(f"Defined in vars: {', '.join(result['defined']) or 'None'}")
     print(f"Built-in/special: {', '.join(result['builtin']) or 'None'}")
+    if index is not None:
+        print(f"Defined elsewhere: {', '.join(result['defined_elsewhere']) or 'None'}")
     print(f"Potentially undefined: {', '.join(result['undefined']) or 'None'}")
     
     return result
@@ -576,7 +3254,9 @@ def ex11_role_scaffold(role_name: str, base_path: str = "roles") -> str:
     """
     Create Ansible role directory structure with placeholder files.
     """
-    if yaml is None:
+    from pathlib import Path
+    
+    if not yaml:
         raise ImportError("pyyaml required: pip install pyyaml")
     
     role_path = Path(base_path) / role_name
@@ -608,7 +3288,7 @@ def ex11_role_scaffold(role_name: str, base_path: str = "roles") -> str:
     for filepath, content in yaml_files.items():
         full_path = role_path / filepath
         with open(full_path, 'w') as f:
-            yaml.dump(content, f, default_flow_style=False, sort_keys=False)
+            yaml_dump(content, f, default_flow_style=False, sort_keys=False)
     
     # Create README
     readme_content = f"""# {role_name}
@@ -651,6 +3331,7 @@ def ex12_vault_helper(action: str, filepath: str, password: str = None) -> bool:
     Helper for Ansible Vault operations (encrypt, decrypt, view).
     """
     import getpass
+    import subprocess
     
     if password is None:
         password = getpass.getpass("Vault password: ")
@@ -691,56 +3372,23 @@ def ex12_vault_helper(action: str, filepath: str, password: str = None) -> bool:
 # Exercise 13: Playbook Linter
 # =============================================================================
 
-def ex13_playbook_linter(playbook_path: str) -> list:
+def ex13_playbook_linter(playbook_path: str, stream: bool = False,
+                         incremental: bool = False) -> list:
     """
     Simple playbook linter checking for common issues.
+
+    With stream=True plays are linted one at a time (see PlayStream).
+    With incremental=True only plays and tasks changed since the previous
+    call are re-linted (see IncrementalChecker).
     """
-    if yaml is None:
+    if not yaml:
         raise ImportError("pyyaml required: pip install pyyaml")
     
-    with open(playbook_path, 'r') as f:
-        content = f.read()
-    
-    playbook = yaml.safe_load(content)
-    warnings = []
-    
-    def check_tasks(tasks, play_num):
-        for i, task in enumerate(tasks, 1):
-            if not isinstance(task, dict):
-                continue
-            
-            task_id = f"Play {play_num}, Task {i}"
-            
-            # Check for name
-            if 'name' not in task:
-                warnings.append(f"{task_id}: Missing 'name' field")
-            
-            # Check shell vs command
-            if 'shell' in task:
-                shell_cmd = task['shell']
-                if isinstance(shell_cmd, str) and '|' not in shell_cmd and '>' not in shell_cmd:
-                    warnings.append(f"{task_id}: Consider using 'command' instead of 'shell'")
-            
-            # Check for hardcoded passwords
-            task_str = str(task)
-            if re.search(r'password["\']?\s*[:=]\s*["\']?\w+', task_str, re.I):
-                warnings.append(f"{task_id}: Possible hardcoded password detected")
-            
-            # Check become for privileged modules
-            privileged_modules = ['apt', 'yum', 'dnf', 'package', 'service', 'systemd', 'user', 'group']
-            for mod in privileged_modules:
-                if mod in task and 'become' not in task:
-                    warnings.append(f"{task_id}: '{mod}' module may require 'become: true'")
-            
-            # Check blocks recursively
-            for block_type in ['block', 'rescue', 'always']:
-                if block_type in task:
-                    check_tasks(task[block_type], play_num)
-    
-    if isinstance(playbook, list):
-        for i, play in enumerate(playbook, 1):
-            if 'tasks' in play:
-                check_tasks(play['tasks'], i)
+    if incremental:
+        warnings = _INCREMENTAL.lint(playbook_path)
+    else:
+        with open_playbook(playbook_path, stream) as playbook:
+            warnings = run_analyzers(playbook, [LintAnalyzer()])["warnings"]
     
     print(f"Lint Results: {playbook_path}")
     print("-" * 40)
@@ -753,127 +3401,591 @@ def ex13_playbook_linter(playbook_path: str) -> list:
     return warnings
 
 
-# =============================================================================
-# Exercise 14: Execution Report Generator
-# =============================================================================
+# =============================================================================
+# Exercise 14: Execution Report Generator
+# =============================================================================
+
+def ex14_report_generator(results: dict, output_file: str = "report.md",
+                          jsonl_file: str = None, csv_file: str = None,
+                          return_report: bool = True) -> str:
+    """
+    Generate a Markdown report from Ansible execution results.
+
+    Host sections are streamed to the file through ReportWriter, which can
+    also write JSON Lines and CSV copies. results["stats"] may be a dict
+    (host -> stats, or ansible-runner's stat -> hosts; see normalize_stats)
+    or any iterable of (host, stats) pairs, such as a generator. With
+    return_report=False the output path is returned instead of the text.
+    """
+    stats = results.get('stats') or {}
+    if isinstance(stats, dict):
+        stats = normalize_stats(stats)
+    
+    with ReportWriter(output_file, status=results.get('status', 'N/A'),
+                      rc=results.get('rc', 'N/A'), jsonl_file=jsonl_file,
+                      csv_file=csv_file) as writer:
+        for host, host_stats in (stats.items() if isinstance(stats, dict) else stats):
+            writer.add_host(host, host_stats)
+    
+    print(f"Report generated: {output_file}")
+    if not return_report:
+        return output_file
+    with open(output_file, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+class ReportWriter:
+    """
+    Writes the ex14 Markdown report one host section at a time.
+
+    Sections go straight to a buffered file, optionally mirrored as JSON
+    Lines (one object per host) and CSV (host, stat, count rows); only
+    the host count and per-stat totals are kept in memory. Files are
+    written under temporary names and renamed into place by close(), so
+    readers never see a half-written report.
+    """
+
+    def __init__(self, output_file: str = "report.md", status="N/A", rc="N/A",
+                 jsonl_file: str = None, csv_file: str = None, buffer_size: int = 1 << 16):
+        from datetime import datetime
+
+        self.hosts = 0
+        self.totals = {}
+        self._files = []  # (temp path, final path, file object)
+
+        self._md = self._open(output_file, buffer_size)
+        self._jsonl = self._open(jsonl_file, buffer_size) if jsonl_file else None
+        self._csv = None
+        if csv_file:
+            import csv
+
+            self._csv = csv.writer(self._open(csv_file, buffer_size, newline=''))
+            self._csv.writerow(["host", "stat", "count"])
+
+        self._md.write(f"""# Ansible Execution Report
+
+**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+
+## Summary
+
+| Metric | Value |
+|--------|-------|
+| Status | {status} |
+| Return Code | {rc} |
+
+## Host Results
+
+""")
+
+    def _open(self, path: str, buffer_size: int, newline=None):
+        fd, tmp_path = _temp_file_for(path)
+        f = open(fd, 'w', buffering=buffer_size, encoding='utf-8', newline=newline)
+        self._files.append((tmp_path, path, f))
+        return f
+
+    def add_host(self, host: str, host_stats: dict):
+        lines = [f"### {host}\n\n", "| Task Type | Count |\n", "|-----------|-------|\n"]
+        for stat_name, count in host_stats.items():
+            emoji = "✓" if stat_name == "ok" else "✗" if stat_name == "failures" else "○"
+            lines.append(f"| {emoji} {stat_name} | {count} |\n")
+            if isinstance(count, (int, float)):
+                self.totals[stat_name] = self.totals.get(stat_name, 0) + count
+        lines.append("\n")
+        self._md.write("".join(lines))
+
+        if self._jsonl is not None:
+            self._jsonl.write(json.dumps({"host": host, **host_stats}, default=str) + "\n")
+        if self._csv is not None:
+            self._csv.writerows((host, stat_name, count) for stat_name, count in host_stats.items())
+        self.hosts += 1
+
+    def close(self) -> dict:
+        """Finish the report and move the files into place; returns the totals."""
+        if not self.hosts:
+            self._md.write("_No statistics available_\n")
+        for tmp_path, path, f in self._files:
+            f.close()
+            os.replace(tmp_path, path)
+        self._files = []
+        return {"hosts": self.hosts, "totals": self.totals}
+
+    def discard(self):
+        for tmp_path, _, f in self._files:
+            f.close()
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+        self._files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class IncrementalReport:
+    """
+    The ex14 report, built from playbook events while a run is going on.
+
+    Only per-host counters are kept. The file is rewritten atomically at
+    most every ``interval`` seconds, so it can be watched during a long
+    run; write() forces a final version.
+    """
+
+    STATS = RUN_STATS
+    EVENT_STATS = dict(PlaybookEventStream.HOST_EVENTS, runner_on_failed_ignored="ignored")
+
+    def __init__(self, output_file: str = "report.md", interval: float = 5.0):
+        self.output_file = output_file
+        self.interval = interval
+        self.stats = {}
+        self._written = 0.0
+
+    def update(self, event: RunEvent):
+        import time
+
+        if event.host is None or event.event not in self.EVENT_STATS:
+            return
+        counts = self.stats.get(event.host)
+        if counts is None:
+            counts = self.stats[event.host] = dict.fromkeys(self.STATS, 0)
+        counts[self.EVENT_STATS[event.event]] += 1
+        if event.changed:
+            counts["changed"] += 1
+        if time.monotonic() - self._written >= self.interval:
+            self.write()
+
+    def write(self, status: str = "running", rc=None):
+        import time
+
+        with ReportWriter(self.output_file, status=status,
+                          rc="N/A" if rc is None else rc) as writer:
+            for host, host_stats in self.stats.items():
+                writer.add_host(host, host_stats)
+        self._written = time.monotonic()
+
+
+def normalize_stats(stats: dict) -> dict:
+    """
+    Return run stats as host -> {stat: count}.
+
+    ansible-runner reports them the other way round, stat -> {host: count}
+    (plus "processed" listing every host); that shape is recognised by
+    its keys and transposed. Host-oriented dicts are returned unchanged.
+    """
+    stats = stats or {}
+    if not all(k in RUN_STATS or k == "processed" for k in stats) \
+            or not all(isinstance(v, dict) for v in stats.values()):
+        return stats
+
+    hosts = {}
+    for stat_hosts in stats.values():
+        hosts.update(dict.fromkeys(stat_hosts))
+    return {host: {s: (stats.get(s) or {}).get(host, 0) for s in RUN_STATS} for host in hosts}
+
+
+class RunStatsStore:
+    """
+    Per-host, per-run counters from many playbook runs, stored by column.
+
+    Every (run, host) pair is one row. Each column (run ID, host ID, the
+    RUN_STATS counters and seconds) is a flat binary file of 32-bit
+    values under ``directory``, appended to with ``array`` and read back
+    through mmap without copying; host names are interned in hosts.txt
+    and run metadata lives in runs.jsonl. A run becomes visible once its
+    runs.jsonl line is written, so an interrupted append is ignored and
+    trimmed by the next one.
+
+    Queries group by host or run with numpy.bincount when numpy is
+    installed, and with plain loops over the mapped columns otherwise.
+    """
+
+    COLUMNS = (("run", "I"), ("host", "I")) + tuple((s, "I") for s in RUN_STATS) \
+        + (("seconds", "f"),)
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or os.path.join(default_cache_dir(), "runstats")
+        os.makedirs(self.directory, exist_ok=True)
+        self._maps = {}
+        self.refresh()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def refresh(self):
+        """Re-read host names and run metadata (e.g. after another process appended)."""
+        self.close()
+        self.runs = []
+        self._runs_size = 0
+        try:
+            with open(self._path("runs.jsonl"), 'rb') as f:
+                for line in f:
+                    try:
+                        self.runs.append(json.loads(line))
+                    except ValueError:
+                        break  # torn last line from an interrupted append
+                    self._runs_size += len(line)
+        except FileNotFoundError:
+            pass
+
+        try:
+            with open(self._path("hosts.txt"), 'rb') as f:
+                names = f.read().split(b"\n")[:-1]  # drops a partial last line
+        except FileNotFoundError:
+            names = []
+        # Hosts appended by a run that never committed are not part of the store
+        names = names[:self.runs[-1].get("hosts", len(names))] if self.runs else []
+        self.hosts = [name.decode('utf-8') for name in names]
+        self._hosts_size = sum(len(name) + 1 for name in names)
+        self.host_ids = {h: i for i, h in enumerate(self.hosts)}
+        self.rows = self.runs[-1]["rows"] if self.runs else 0
+
+    def close(self):
+        """Unmap the columns; maps still exported to callers go when those do."""
+        for mapped in self._maps.values():
+            try:
+                mapped.close()
+            except BufferError:
+                pass
+        self._maps = {}
+
+    def add_run(self, stats: dict, label: str = None, status: str = None,
+                durations: dict = None, timestamp: float = None) -> int:
+        """
+        Append one run's stats (either orientation, see normalize_stats)
+        and optional per-host durations in seconds. Returns the run ID.
+        """
+        import time
+        from array import array
+
+        stats = normalize_stats(stats)
+        durations = durations or {}
+        run_id = len(self.runs)
+
+        new_hosts = [h for h in stats if h not in self.host_ids]
+        if new_hosts:
+            data = "".join(h + "\n" for h in new_hosts).encode('utf-8')
+            with open(self._path("hosts.txt"), 'ab') as f:
+                f.truncate(self._hosts_size)  # drop a torn earlier append
+                f.write(data)
+            self._hosts_size += len(data)
+            for host in new_hosts:
+                self.host_ids[host] = len(self.hosts)
+                self.hosts.append(host)
+
+        values = {
+            "run": [run_id] * len(stats),
+            "host": [self.host_ids[h] for h in stats],
+            "seconds": [float(durations.get(h, "nan")) for h in stats],
+        }
+        for stat in RUN_STATS:
+            values[stat] = [int(s.get(stat, 0) or 0) for s in stats.values()]
+
+        for name, typecode in self.COLUMNS:
+            column = array(typecode, values[name])
+            with open(self._path(name + ".bin"), 'ab') as f:
+                f.truncate(self.rows * column.itemsize)  # drop a torn earlier append
+                f.write(column.tobytes())
+
+        run = {"run": run_id, "time": timestamp or time.time(), "label": label,
+               "status": status, "rows": self.rows + len(stats), "hosts": len(self.hosts)}
+        line = (json.dumps(run) + "\n").encode('utf-8')
+        with open(self._path("runs.jsonl"), 'ab') as f:
+            f.truncate(self._runs_size)  # drop a torn earlier append
+            f.write(line)
+        self._runs_size += len(line)
+        self.runs.append(run)
+        self.rows = run["rows"]
+        return run_id
+
+    def column(self, name: str):
+        """
+        Return a column as a numpy array, or a memoryview without numpy.
+
+        The result is a view of the mapped file. Columns are remapped when
+        they have grown, never closed under a caller, so views handed out
+        earlier stay valid (covering the rows at the time) after add_run().
+        """
+        import mmap
+        from array import array
+
+        typecode = dict(self.COLUMNS)[name]
+        if not self.rows:
+            return numpy.zeros(0, dtype=typecode) if numpy else memoryview(array(typecode))
+        size = self.rows * array(typecode).itemsize
+        mapped = self._maps.get(name)
+        if mapped is None or len(mapped) < size:
+            with open(self._path(name + ".bin"), 'rb') as f:
+                mapped = self._maps[name] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if numpy:
+            return numpy.frombuffer(mapped, dtype=typecode, count=self.rows)
+        return memoryview(mapped).cast(typecode)[:self.rows]
+
+    def _group_sum(self, key: str, values, size: int) -> list:
+        keys = self.column(key)
+        if numpy:
+            return numpy.bincount(keys, weights=values, minlength=size).tolist()
+        sums = [0] * size
+        for k, v in zip(keys, values):
+            sums[k] += v
+        return sums
+
+    def _runs_per_host(self) -> list:
+        ones = numpy.ones(self.rows) if numpy else [1] * self.rows
+        return self._group_sum("host", ones, len(self.hosts))
+
+    def host_totals(self) -> dict:
+        """Return host -> {stat: total over all runs, "runs": run count}."""
+        totals = {"runs": self._runs_per_host()}
+        for stat in RUN_STATS:
+            totals[stat] = self._group_sum("host", self.column(stat), len(self.hosts))
+        return {host: {name: int(sums[i]) for name, sums in totals.items()}
+                for i, host in enumerate(self.hosts) if totals["runs"][i]}
+
+    def failure_rates(self, top: int = None) -> list:
+        """
+        Return (host, rate, runs) sorted by rate, highest first, where rate
+        is the share of a host's runs with failed or unreachable results.
+        """
+        failures, dark = self.column("failures"), self.column("dark")
+        if numpy:
+            bad = (failures + dark) > 0
+        else:
+            bad = [f + d > 0 for f, d in zip(failures, dark)]
+        failed = self._group_sum("host", bad, len(self.hosts))
+        runs = self._runs_per_host()
+        rates = [(host, failed[i] / runs[i], int(runs[i]))
+                 for i, host in enumerate(self.hosts) if runs[i]]
+        rates.sort(key=lambda r: (-r[1], -r[2], r[0]))
+        return rates[:top] if top else rates
+
+    def slowest_hosts(self, top: int = 10) -> list:
+        """Return (host, mean seconds, timed runs) for the slowest hosts."""
+        n = len(self.hosts)
+        host_ids, seconds = self.column("host"), self.column("seconds")
+        if numpy:
+            timed = ~numpy.isnan(seconds)
+            sums = numpy.bincount(host_ids[timed], weights=seconds[timed], minlength=n).tolist()
+            counts = numpy.bincount(host_ids[timed], minlength=n).tolist()
+        else:
+            sums, counts = [0.0] * n, [0] * n
+            for host_id, value in zip(host_ids, seconds):
+                if value == value:  # not NaN
+                    sums[host_id] += value
+                    counts[host_id] += 1
+        slowest = [(host, sums[i] / counts[i], counts[i])
+                   for i, host in enumerate(self.hosts) if counts[i]]
+        slowest.sort(key=lambda r: (-r[1], r[0]))
+        return slowest[:top]
+
+    def changed_over_time(self) -> list:
+        """Return (run ID, timestamp, label, changed tasks across all hosts) per run."""
+        changed = self._group_sum("run", self.column("changed"), len(self.runs))
+        return [(run["run"], run["time"], run["label"], int(changed[i]))
+                for i, run in enumerate(self.runs)]
+
+    def report(self, output_file: str = "report.md", **kwargs) -> str:
+        """Write the per-host totals as an ex14 report."""
+        results = {"status": f"{len(self.runs)} runs", "rc": "N/A",
+                   "stats": self.host_totals()}
+        return ex14_report_generator(results, output_file, **kwargs)
+
+
+# =============================================================================
+# Exercise 15: Host Pattern Matcher
+# =============================================================================
+
+_HOST_SUBSCRIPT = re.compile(r'^(.+)\[(?:(-?\d+)|(\d*)[:-](-?\d*))\]$')
+
+_HOST_TERM_REGEXES = LRUCache(maxsize=1024)
+
+
+def _compile_host_term(term: str):
+    """Compile a wildcard or ~regex term once; cached across inventories."""
+    regex = _HOST_TERM_REGEXES.get(term)
+    if regex is None:
+        import fnmatch
+
+        source = term[1:] if term.startswith('~') else fnmatch.translate(term)
+        try:
+            regex = re.compile(source)
+        except re.error as e:
+            raise ValueError(f"Invalid host pattern '{term}': {e}") from None
+        _HOST_TERM_REGEXES.put(term, regex)
+    return regex
+
+
+def _split_host_pattern(pattern: str) -> list:
+    """Split a pattern on ':' and ',' while leaving [..], (..) and {..} intact."""
+    parts = []
+    current = []
+    depth = 0
+    for ch in pattern:
+        if ch in '[({':
+            depth += 1
+        elif ch in '])}':
+            depth = max(depth - 1, 0)
+        elif ch in ':,' and depth == 0:
+            parts.append(''.join(current))
+            current = []
+            continue
+        current.append(ch)
+    parts.append(''.join(current))
+    return parts
 
-def ex14_report_generator(results: dict, output_file: str = "report.md") -> str:
+
+_PATTERN_PLANS = LRUCache(maxsize=1024)
+_PATTERN_RESULTS = LRUCache(maxsize=4096)
+_COMPILED_INVENTORIES = LRUCache(maxsize=8)
+
+
+def _parse_host_pattern(pattern: str) -> tuple:
     """
-    Generate a Markdown report from Ansible execution results.
+    Parse a pattern into a plan of (operator, term) steps.
+
+    Operators are '|' (union), '&' (intersection) and '-' (exclusion).
+    Plans depend only on the pattern string and are memoized.
     """
-    from datetime import datetime
-    
-    report = f"""# Ansible Execution Report
+    plan = _PATTERN_PLANS.get(pattern)
+    if plan is None:
+        steps = []
+        for part in _split_host_pattern(pattern):
+            if part.startswith('&'):
+                steps.append(('&', part[1:].strip()))
+            elif part.startswith('!'):
+                steps.append(('-', part[1:].strip()))
+            else:
+                steps.append(('|', part.strip()))
+        plan = tuple(steps)
+        _PATTERN_PLANS.put(pattern, plan)
+    return plan
 
-**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
-## Summary
+def _inventory_shape(inventory) -> tuple:
+    """
+    Everything host pattern matching depends on, as a hashable tuple:
+    each group's name, host names (in order) and child names, in the
+    order CompiledInventory visits them. Vars are left out, so this is
+    far cheaper to build than a content fingerprint.
+    """
+    shape = []
 
-| Metric | Value |
-|--------|-------|
-| Status | {results.get('status', 'N/A')} |
-| Return Code | {results.get('rc', 'N/A')} |
+    def walk(data, group):
+        if not isinstance(data, dict):
+            shape.append((group, None, None))
+            return
+        hosts = tuple(data['hosts'] or ()) if 'hosts' in data else None
+        children = (data['children'] or {}) if 'children' in data else None
+        shape.append((group, hosts, None if children is None else tuple(children)))
+        for child_name, child_data in (children or {}).items():
+            walk(child_data, child_name)
 
-## Host Results
+    walk((inventory or {}).get('all', inventory), "all")
+    return tuple(shape)
 
-"""
-    
-    stats = results.get('stats', {})
-    for host, host_stats in stats.items():
-        report += f"### {host}\n\n"
-        report += "| Task Type | Count |\n"
-        report += "|-----------|-------|\n"
-        for stat_name, count in host_stats.items():
-            emoji = "✓" if stat_name == "ok" else "✗" if stat_name == "failures" else "○"
-            report += f"| {emoji} {stat_name} | {count} |\n"
-        report += "\n"
-    
-    if not stats:
-        report += "_No statistics available_\n"
-    
-    with open(output_file, 'w') as f:
-        f.write(report)
-    
-    print(f"Report generated: {output_file}")
-    return report
 
+_INVENTORY_SHAPE_IDS = itertools.count()
 
-# =============================================================================
-# Exercise 15: Host Pattern Matcher
-# =============================================================================
 
-def ex15_pattern_matcher(inventory: dict, pattern: str) -> list:
+def _compile_inventory_cached(inventory: dict, version: str = None) -> CompiledInventory:
+    """
+    Compile a raw inventory dict, reusing the result while it matches.
+
+    With a caller-supplied version the cache is keyed on that token alone.
+    Otherwise it is keyed on the inventory's shape (see _inventory_shape),
+    so any edit that can change a match invalidates it automatically.
+    """
+    if version is None:
+        shape = _inventory_shape(inventory)
+        # Keyed on the hash so the big tuple is hashed once per call
+        key = ("shape", hash(shape))
+    else:
+        shape = None
+        key = ("version", version)
+    entry = _COMPILED_INVENTORIES.get(key)
+    if entry is None or entry[0] != shape:
+        if version is None:
+            # A token unique to this shape; cached results are keyed on it
+            version = ("shape", next(_INVENTORY_SHAPE_IDS))
+        entry = (shape, CompiledInventory(inventory, version=version))
+        _COMPILED_INVENTORIES.put(key, entry)
+    return entry[1]
+
+
+def _match_host_pattern(inventory: CompiledInventory, pattern: str) -> tuple:
+    """Evaluate a pattern against a compiled inventory; sorted host names."""
+    result = 0
+    for op, term in _parse_host_pattern(pattern):
+        if op == '&':
+            # Intersection
+            result &= inventory.match(term)
+        elif op == '-':
+            # Exclusion
+            result &= ~inventory.match(term)
+        else:
+            # Union
+            result |= inventory.match(term)
+    return tuple(sorted(inventory.names(result)))
+
+
+def pattern_cache_info() -> dict:
+    """Return hit/miss statistics for the ex15 pattern caches."""
+    return {
+        "plans": _PATTERN_PLANS.info(),
+        "results": _PATTERN_RESULTS.info(),
+        "inventories": _COMPILED_INVENTORIES.info(),
+        "regexes": _HOST_TERM_REGEXES.info(),
+    }
+
+
+def clear_pattern_caches():
+    """Drop every cached pattern plan, result, compiled inventory and regex."""
+    for cache in (_PATTERN_PLANS, _PATTERN_RESULTS, _COMPILED_INVENTORIES,
+                  _HOST_TERM_REGEXES):
+        cache.clear()
+
+
+def ex15_pattern_matcher(inventory, pattern: str, verbose: bool = True,
+                         version: str = None) -> list:
     """
     Match hosts using Ansible-style patterns.
     
     Supports:
     - Wildcards: web*
+    - Regexes: ~web\\d+\\.example\\.com
     - Negation: !dbservers
     - Intersection: webservers:&staging
-    - Union: webservers:dbservers
+    - Union: webservers:dbservers or webservers,dbservers
+    - Subscripts: webservers[0], webservers[-1], webservers[0:2]
+
+    Terms are applied left to right as bitset operations over host IDs.
+    ``inventory`` may be a raw inventory dict or a CompiledInventory;
+    pass the compiled form when running many patterns against one load.
+
+    Parsed patterns and results are memoized (see pattern_cache_info()).
+    A raw dict is recompiled only when its groups, hosts or children
+    change, so editing the inventory invalidates cached results
+    automatically. Callers that track changes themselves can pass
+    ``version``, any token that changes whenever the dict does, to skip
+    that check; reusing a token after an edit returns stale results.
     """
-    import fnmatch
-    
-    # Collect all hosts
-    all_hosts = set()
-    group_hosts = {}
-    
-    def collect_hosts(data, group="all"):
-        if isinstance(data, dict):
-            if 'hosts' in data:
-                hosts = list(data['hosts'].keys()) if isinstance(data['hosts'], dict) else data['hosts']
-                group_hosts[group] = set(hosts)
-                all_hosts.update(hosts)
-            if 'children' in data:
-                for child_name, child_data in data['children'].items():
-                    collect_hosts(child_data, child_name)
-    
-    collect_hosts(inventory.get('all', inventory))
-    group_hosts['all'] = all_hosts
-    
-    def resolve_pattern(pat):
-        pat = pat.strip()
-        
-        # Negation
-        if pat.startswith('!'):
-            return all_hosts - resolve_pattern(pat[1:])
-        
-        # Group name
-        if pat in group_hosts:
-            return group_hosts[pat]
-        
-        # Wildcard pattern
-        if '*' in pat or '?' in pat:
-            return {h for h in all_hosts if fnmatch.fnmatch(h, pat)}
-        
-        # Single host
-        if pat in all_hosts:
-            return {pat}
-        
-        return set()
-    
-    # Handle compound patterns
-    result = set()
-    
-    # Split by : for union/intersection
-    parts = pattern.split(':')
-    
-    for part in parts:
-        if part.startswith('&'):
-            # Intersection
-            result = result & resolve_pattern(part[1:])
-        elif part.startswith('!'):
-            # Exclusion
-            result = result - resolve_pattern(part[1:])
-        else:
-            # Union
-            if not result:
-                result = resolve_pattern(part)
-            else:
-                result = result | resolve_pattern(part)
-    
-    matched = sorted(result)
-    print(f"Pattern '{pattern}' matched: {matched}")
+    if not isinstance(inventory, CompiledInventory):
+        inventory = _compile_inventory_cached(inventory, version)
+
+    key = (inventory.version, pattern)
+    cached = _PATTERN_RESULTS.get(key)
+    if cached is None:
+        cached = _match_host_pattern(inventory, pattern)
+        _PATTERN_RESULTS.put(key, cached)
+
+    matched = list(cached)
+    if verbose:
+        print(f"Pattern '{pattern}' matched: {matched}")
     return matched
 
 
@@ -885,6 +3997,8 @@ def ex16_module_docs(module_name: str) -> dict:
     """
     Get and parse Ansible module documentation.
     """
+    import subprocess
+    
     cmd = ["ansible-doc", "-j", module_name]
     
     try:
@@ -928,7 +4042,7 @@ def ex17_playbook_merger(playbook_files: list, output_file: str = "merged_playbo
     """
     Merge multiple playbooks into one.
     """
-    if yaml is None:
+    if not yaml:
         raise ImportError("pyyaml required: pip install pyyaml")
     
     merged_plays = []
@@ -936,7 +4050,7 @@ def ex17_playbook_merger(playbook_files: list, output_file: str = "merged_playbo
     
     for filepath in playbook_files:
         with open(filepath, 'r') as f:
-            playbook = yaml.safe_load(f)
+            playbook = yaml_load(f)
         
         if isinstance(playbook, list):
             for play in playbook:
@@ -952,7 +4066,7 @@ def ex17_playbook_merger(playbook_files: list, output_file: str = "merged_playbo
         merged_plays[0]['vars'].update(all_vars)
     
     with open(output_file, 'w') as f:
-        yaml.dump(merged_plays, f, default_flow_style=False, sort_keys=False)
+        yaml_dump(merged_plays, f, default_flow_style=False, sort_keys=False)
     
     print(f"Merged {len(playbook_files)} playbooks into: {output_file}")
     print(f"Total plays: {len(merged_plays)}")
@@ -964,10 +4078,127 @@ def ex17_playbook_merger(playbook_files: list, output_file: str = "merged_playbo
 # Exercise 18: Connection Tester
 # =============================================================================
 
-def ex18_connection_tester(inventory_path: str) -> dict:
+ProbeResult = namedtuple("ProbeResult", "host ok latency detail")
+
+
+async def _probe_host(host: str, address: str, port: int, method: str,
+                      timeout: float, semaphore) -> ProbeResult:
+    """
+    Open a TCP connection to one host and, for the ssh method, read the
+    server's identification line. The whole probe shares one timeout.
+    """
+    import asyncio
+    import time
+
+    async def probe():
+        reader, writer = await asyncio.open_connection(address, port)
+        try:
+            if method == "tcp":
+                return True, f"{address}:{port} open"
+            banner = (await reader.readline()).decode('ascii', 'replace').strip()
+            if banner.startswith("SSH-"):
+                return True, banner
+            return False, f"no SSH banner ({banner[:40]!r})"
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            ok, detail = await asyncio.wait_for(probe(), timeout)
+        except asyncio.TimeoutError:
+            ok, detail = False, f"timeout after {timeout:g}s"
+        except OSError as e:
+            ok, detail = False, e.strerror or str(e)
+        except Exception as e:
+            # e.g. UnicodeError for a bad IDNA name, ValueError, LimitOverrunError
+            # for an overlong banner: one bad host must not end the whole run
+            ok, detail = False, f"{type(e).__name__}: {e}"
+        return ProbeResult(host, ok, time.perf_counter() - start, detail)
+
+
+async def probe_hosts(targets, method: str = "ssh", concurrency: int = 500,
+                      timeout: float = 5.0):
+    """
+    Probe (host, address, port) targets concurrently, yielding a
+    ProbeResult for each as soon as it finishes. At most ``concurrency``
+    connections are open at once.
+    """
+    import asyncio
+
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [asyncio.ensure_future(_probe_host(host, address, port, method, timeout, semaphore))
+             for host, address, port in targets]
+    try:
+        for future in asyncio.as_completed(tasks):
+            yield await future
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def connection_targets(inventory: CompiledInventory) -> list:
+    """Return (host, address, port) for every host, honouring ansible_host/ansible_port."""
+    targets = []
+    for host, _groups, variables in inventory.iter_host_variables():
+        address = variables.get("ansible_host") or host
+        port = variables.get("ansible_port") or variables.get("ansible_ssh_port") or 22
+        targets.append((host, str(address), int(port)))
+    return targets
+
+
+# Latency histogram bucket upper bounds, in milliseconds
+_LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def latency_histogram(latencies_ms) -> list:
+    """Count latencies into _LATENCY_BUCKETS; returns [(label, count)]."""
+    import bisect
+
+    counts = [0] * (len(_LATENCY_BUCKETS) + 1)
+    for value in latencies_ms:
+        counts[bisect.bisect_left(_LATENCY_BUCKETS, value)] += 1
+    labels = [f"<= {b} ms" for b in _LATENCY_BUCKETS] + [f"> {_LATENCY_BUCKETS[-1]} ms"]
+    return list(zip(labels, counts))
+
+
+def _print_histogram(histogram: list, width: int = 40):
+    # Drop empty buckets at both ends so the chart stays short
+    filled = [i for i, (_, count) in enumerate(histogram) if count]
+    if not filled:
+        return
+    rows = histogram[filled[0]:filled[-1] + 1]
+    peak = max(count for _, count in rows)
+    for label, count in rows:
+        bar = "#" * max(1 if count else 0, round(count * width / peak))
+        print(f"  {label:>11} {count:>7} {bar}")
+
+
+def ex18_connection_tester(inventory_path: str, method: str = "ssh",
+                           concurrency: int = 500, timeout: float = 5.0,
+                           verbose: bool = True) -> dict:
     """
-    Test connectivity to all hosts in inventory using ansible ping.
+    Test connectivity to all hosts in inventory.
+
+    The default "ssh" method connects to every host concurrently (at most
+    ``concurrency`` at a time, each within ``timeout`` seconds) and waits
+    for the SSH identification banner; "tcp" only checks that the port
+    accepts connections. Addresses and ports come from ansible_host and
+    ansible_port, so local stand-in listeners work for testing (see
+    bench_connection_tester). Results print as they arrive, followed by
+    a latency histogram.
+
+    method="ansible" runs `ansible all -m ping` instead, as before.
     """
+    if method != "ansible":
+        return _async_connection_test(inventory_path, method, concurrency, timeout, verbose)
+
+    import subprocess
+    
     cmd = ["ansible", "all", "-i", inventory_path, "-m", "ping", "--one-line"]
     
     try:
@@ -1013,6 +4244,53 @@ def ex18_connection_tester(inventory_path: str) -> dict:
         return {}
 
 
+def _async_connection_test(inventory_path: str, method: str, concurrency: int,
+                           timeout: float, verbose: bool) -> dict:
+    import asyncio
+    import time
+
+    if method not in ("ssh", "tcp"):
+        raise ValueError(f"Unknown connection test method: {method}")
+
+    targets = connection_targets(CompiledInventory.from_file(inventory_path))
+    results = {}
+
+    async def run():
+        async for result in probe_hosts(targets, method, concurrency, timeout):
+            results[result.host] = result
+            if verbose:
+                mark = "✓" if result.ok else "✗"
+                print(f"  {mark} {result.host:<40} {result.latency * 1000:8.1f} ms  {result.detail}")
+
+    if verbose:
+        print(f"Connection Test Results ({method}, {len(targets)} hosts):")
+        print("-" * 40)
+    start = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    # Report in inventory order, whatever order the probes finished in
+    ordered = [results[host] for host, _, _ in targets]
+    reachable = [r.host for r in ordered if r.ok]
+    unreachable = [r.host for r in ordered if not r.ok]
+    histogram = latency_histogram(r.latency * 1000 for r in ordered if r.ok)
+
+    if verbose:
+        print(f"\nReachable: {len(reachable)}  Unreachable: {len(unreachable)}  "
+              f"({elapsed:.2f}s)")
+        print("Latency of reachable hosts:")
+        _print_histogram(histogram)
+
+    return {
+        "reachable": reachable,
+        "unreachable": unreachable,
+        "latency_ms": {r.host: r.latency * 1000 for r in ordered},
+        "errors": {r.host: r.detail for r in ordered if not r.ok},
+        "histogram": histogram,
+        "seconds": elapsed,
+    }
+
+
 # =============================================================================
 # Exercise 19: Config File Generator
 # =============================================================================
@@ -1034,8 +4312,8 @@ host_key_checking = {str(host_key_checking).lower()}
 retry_files_enabled = false
 gathering = smart
 fact_caching = jsonfile
-fact_caching_connection = /tmp/ansible_facts
-fact_caching_timeout = 3600
+fact_caching_connection = {FACT_CACHE_DIR}
+fact_caching_timeout = {FACT_CACHE_TIMEOUT}
 
 [privilege_escalation]
 become = true
@@ -1065,25 +4343,381 @@ pipelining = true
 # Exercise 20: Full Automation Framework (CLI Entry Point)
 # =============================================================================
 
-def ex20_cli():
+def _expand_paths(patterns: list) -> list:
+    """
+    Expand CLI path arguments: directories recurse to *.yml/*.yaml files,
+    glob patterns are expanded, plain paths pass through (missing ones
+    included, so they are reported). Order is stable and duplicates drop.
+    """
+    import glob
+
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            found = []
+            for root, dirs, files in os.walk(pattern):
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
+                found.extend(os.path.join(root, f) for f in files
+                             if f.endswith(('.yml', '.yaml')))
+            paths.extend(sorted(found))
+        elif glob.has_magic(pattern):
+            paths.extend(p for p in sorted(glob.glob(pattern, recursive=True))
+                         if os.path.isfile(p))
+        else:
+            paths.append(pattern)
+    return list(dict.fromkeys(paths))
+
+
+def _init_check_worker(cache_dir, use_cache):
+    """Pool initializer: give each worker process the parent's cache setup."""
+    if use_cache:
+        enable_disk_cache(cache_dir)
+
+
+def _check_file(command: str, path: str, incremental: bool = False) -> tuple:
+    """
+    Run the validator or linter on one file with its output captured.
+    Returns (path, rc, output) where rc is 0 clean, 1 problems found,
+    2 the file could not be checked at all.
+    """
+    import contextlib
+    import io
+
+    out = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(out):
+            if command == "validate":
+                is_valid, errors = ex04_yaml_validator(path, incremental=incremental)
+            else:
+                warnings = ex13_playbook_linter(path, incremental=incremental)
+    except Exception as e:
+        return path, 2, f"✗ {path}: {type(e).__name__}: {e}\n"
+
+    if command == "validate":
+        rc = 0 if is_valid else 1
+        if not is_valid and not out.getvalue():
+            # The validator returns early without printing for
+            # missing files and syntax errors
+            out.write(f"✗ {path} has errors:\n")
+            for error in errors:
+                out.write(f"  - {error}\n")
+    else:
+        rc = 1 if warnings else 0
+    return path, rc, out.getvalue()
+
+
+def check_files(command: str, patterns: list, jobs: int = None, chunksize: int = None,
+                cache_dir: str = None, use_cache: bool = True) -> int:
+    """
+    Validate or lint many playbooks, fanned out over a process pool.
+
+    Output is printed in input order regardless of which worker finished
+    first, followed by a summary. Returns the worst per-file result code.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    paths = _expand_paths(patterns)
+    if not paths:
+        print("No playbooks found")
+        return 2
+
+    jobs = jobs or os.cpu_count() or 1
+    jobs = min(jobs, len(paths))
+    if chunksize is None:
+        chunksize = max(1, len(paths) // (jobs * 4))
+
+    commands = [command] * len(paths)
+    if jobs == 1:
+        results = map(_check_file, commands, paths)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_check_worker,
+            initargs=(cache_dir, use_cache),
+        )
+        results = pool.map(_check_file, commands, paths, chunksize=chunksize)
+
+    worst = 0
+    failed = 0
+    try:
+        for path, rc, output in results:
+            sys.stdout.write(output)
+            worst = max(worst, rc)
+            failed += rc > 0
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    print(f"\n{command}: {len(paths)} file(s) checked, {failed} with problems")
+    return worst
+
+
+class FileWatcher:
+    """
+    Report changed YAML files under a set of files and directories.
+
+    Uses Linux inotify (through ctypes, no extra packages) and falls back
+    to polling file stats where inotify is unavailable. changes() blocks
+    until something changed, then returns the changed paths after a short
+    settle window so an editor's burst of events becomes one change.
+    """
+
+    # inotify(7) constants
+    IN_MODIFY = 0x2
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    def __init__(self, patterns: list, poll_interval: float = 0.5,
+                 settle: float = 0.02, use_inotify: bool = True):
+        self.patterns = patterns
+        self.poll_interval = poll_interval
+        self.settle = settle
+        self._fd = None
+        self._watches = {}  # watch descriptor -> directory
+        if use_inotify and sys.platform.startswith('linux'):
+            try:
+                self._init_inotify()
+            except OSError:
+                # e.g. max_user_watches reached part way: poll instead
+                self.close()
+                self._watches = {}
+        if self._fd is None:
+            self._snapshot = self._scan()
+
+    @property
+    def backend(self) -> str:
+        return "inotify" if self._fd is not None else "polling"
+
+    # -- inotify -------------------------------------------------------------
+
+    def _init_inotify(self):
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._libc = libc
+        fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._fd = fd
+        for pattern in self.patterns:
+            if os.path.isdir(pattern):
+                for root, dirs, _files in os.walk(pattern):
+                    dirs[:] = [d for d in dirs if not d.startswith('.')]
+                    self._add_watch(root)
+            else:
+                # Watch the parent: editors often replace files by rename
+                self._add_watch(os.path.dirname(pattern) or '.')
+
+    def _add_watch(self, directory):
+        import ctypes
+
+        mask = (self.IN_CLOSE_WRITE | self.IN_MOVED_FROM | self.IN_MOVED_TO
+                | self.IN_CREATE | self.IN_DELETE | self.IN_MODIFY)
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"cannot watch {directory}")
+        self._watches[wd] = directory
+
+    def _read_events(self, timeout):
+        import select
+        import struct
+
+        changed = set()
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        while ready:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = struct.unpack_from('iIII', data, offset)
+                offset += 16
+                name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+                offset += length
+                directory = self._watches.get(wd)
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, name)
+                if mask & self.IN_ISDIR:
+                    if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                        try:
+                            self._add_watch(path)
+                        except OSError:
+                            pass  # already gone again, or out of watches
+                elif self._wanted(path):
+                    changed.add(path)
+            ready, _, _ = select.select([self._fd], [], [], self.settle)
+        return changed
+
+    def _wanted(self, path):
+        if not path.endswith(('.yml', '.yaml')):
+            return False
+        for pattern in self.patterns:
+            if os.path.isdir(pattern) or os.path.normpath(path) == os.path.normpath(pattern):
+                return True
+        return False
+
+    # -- polling -------------------------------------------------------------
+
+    def _scan(self) -> dict:
+        snapshot = {}
+        for path in _expand_paths(self.patterns):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def _poll(self, timeout):
+        import time
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {p for p in current.keys() | self._snapshot.keys()
+                       if current.get(p) != self._snapshot.get(p)}
+            self._snapshot = current
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.poll_interval)
+
+    # -- public --------------------------------------------------------------
+
+    def changes(self, timeout: float = None) -> list:
+        """Block until files change (or timeout) and return them sorted."""
+        if self._fd is not None:
+            return sorted(self._read_events(timeout))
+        return sorted(self._poll(timeout))
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def watch_files(patterns: list, poll: bool = False, interval: float = 0.5,
+                max_cycles: int = None) -> int:
+    """
+    Validate and lint files, then keep re-checking them as they change.
+
+    Parsed documents and findings stay in memory between saves (see
+    DocumentCache and IncrementalChecker), so a save only costs parsing
+    that file and re-checking its changed plays. Runs until interrupted
+    or until max_cycles batches of changes have been handled.
+    """
+    import time
+
+    def check(paths):
+        for path in paths:
+            start = time.perf_counter()
+            if not os.path.exists(path):
+                print(f"- {path} removed")
+                _DOCUMENTS.invalidate(path)
+                continue
+            for command in ("validate", "lint"):
+                sys.stdout.write(_check_file(command, path, incremental=True)[2])
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"  ({elapsed:.0f} ms)")
+        sys.stdout.flush()
+
+    with FileWatcher(patterns, poll_interval=interval, use_inotify=not poll) as watcher:
+        check(_expand_paths(patterns))
+        print(f"\nWatching {', '.join(patterns)} ({watcher.backend}); Ctrl-C to stop")
+        cycles = 0
+        try:
+            while max_cycles is None or cycles < max_cycles:
+                changed = watcher.changes()
+                if changed:
+                    cycles += 1
+                    check(changed)
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+def ex20_cli(argv: list = None) -> int:
     """
     Command-line interface for the automation framework.
     This ties together all the previous exercises.
+    Returns the process exit code.
     """
     import argparse
     
     parser = argparse.ArgumentParser(
         description="Ansible Helper - Python Automation Framework"
     )
+    parser.add_argument("--cache-dir", default=None,
+                        help="Parse cache directory (default: ~/.cache/ansible-helper)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Do not read or write the on-disk parse cache")
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
     
-    # Validate command
-    validate_parser = subparsers.add_parser("validate", help="Validate a playbook")
-    validate_parser.add_argument("playbook", help="Path to playbook")
+    # Validate and lint commands
+    for name, help_text in (("validate", "Validate playbooks"), ("lint", "Lint playbooks")):
+        check_parser = subparsers.add_parser(name, help=help_text)
+        check_parser.add_argument("paths", nargs="+",
+                                  help="Playbook files, directories or glob patterns")
+        check_parser.add_argument("-j", "--jobs", type=int, default=None,
+                                  help="Worker processes (default: CPU count)")
+        check_parser.add_argument("--chunksize", type=int, default=None,
+                                  help="Files handed to a worker at a time")
+    
+    # Watch command
+    watch_parser = subparsers.add_parser("watch", help="Re-check playbooks as they change")
+    watch_parser.add_argument("paths", nargs="+", help="Playbook files or directories")
+    watch_parser.add_argument("--poll", action="store_true",
+                              help="Poll file stats instead of using inotify")
+    watch_parser.add_argument("--interval", type=float, default=0.5,
+                              help="Polling interval in seconds")
+    
+    # Per-host render command
+    render_parser = subparsers.add_parser("render", help="Render a template for every host")
+    render_parser.add_argument("inventory", help="YAML inventory file")
+    render_parser.add_argument("template", help="Jinja2 template file")
+    render_parser.add_argument("-o", "--output-dir", default="rendered",
+                               help="Directory for the per-host files")
+    render_parser.add_argument("--suffix", default=".conf", help="Output file suffix")
+    render_parser.add_argument("-j", "--jobs", type=int, default=None,
+                               help="Worker processes (default: CPU count)")
+    render_parser.add_argument("--force", action="store_true",
+                               help="Re-render hosts even if their inputs are unchanged")
+    
+    # Variable check against a repository-wide index
+    vars_parser = subparsers.add_parser("vars", help="Report variables used by playbooks")
+    vars_parser.add_argument("paths", nargs="+", help="Playbook files")
+    vars_parser.add_argument("--root", default=".",
+                             help="Repository root to index definitions from")
     
-    # Lint command
-    lint_parser = subparsers.add_parser("lint", help="Lint a playbook")
-    lint_parser.add_argument("playbook", help="Path to playbook")
+    # Inventory snapshot command
+    snap_parser = subparsers.add_parser("snapshot", help="Snapshot an inventory and show changes")
+    snap_parser.add_argument("inventory", help="YAML inventory file")
+    snap_parser.add_argument("--against", type=int, default=1,
+                             help="Compare with the Nth previous snapshot (default: 1)")
+    snap_parser.add_argument("--keep", type=int, default=10, help="Snapshots to retain")
+    
+    # Import-time budget check
+    import_parser = subparsers.add_parser("import-time", help="Measure module import time")
+    import_parser.add_argument("--budget-ms", type=float, default=None,
+                               help="Fail if importing takes longer than this")
     
     # Generate command
     gen_parser = subparsers.add_parser("generate", help="Generate a playbook")
@@ -1098,24 +4732,333 @@ def ex20_cli():
     inv_parser = subparsers.add_parser("inventory", help="Dynamic inventory")
     inv_parser.add_argument("--list", action="store_true", help="List all hosts")
     inv_parser.add_argument("--host", help="Get vars for a host")
+    inv_parser.add_argument("--source", default=None,
+                            help="yaml:PATH, sqlite:PATH or an http(s) URL (default: example)")
+    inv_parser.add_argument("--ttl", type=float, default=None,
+                            help="Seconds to reuse cached --list results (0 disables)")
+    
+    # Cache maintenance command
+    prune_parser = subparsers.add_parser("prune-cache", help="Prune the parse cache")
+    prune_parser.add_argument("--max-age-days", type=float, help="Drop entries unused this long")
+    prune_parser.add_argument("--max-size-mb", type=float, help="Shrink cache to this size")
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
-    if args.command == "validate":
-        ex04_yaml_validator(args.playbook)
-    elif args.command == "lint":
-        ex13_playbook_linter(args.playbook)
+    if not args.no_cache:
+        enable_disk_cache(args.cache_dir)
+    
+    if args.command in ("validate", "lint"):
+        return check_files(
+            args.command, args.paths,
+            jobs=args.jobs, chunksize=args.chunksize,
+            cache_dir=args.cache_dir, use_cache=not args.no_cache,
+        )
+    elif args.command == "watch":
+        return watch_files(args.paths, poll=args.poll, interval=args.interval)
+    elif args.command == "render":
+        with open(args.template, 'r') as f:
+            template_string = f.read()
+        summary = render_inventory(args.inventory, template_string, args.output_dir,
+                                   suffix=args.suffix, jobs=args.jobs, force=args.force)
+        return 1 if summary["failed"] else 0
+    elif args.command == "vars":
+        index = VariableIndex(args.root, cache_dir=args.cache_dir)
+        index.update()
+        undefined = False
+        for path in args.paths:
+            undefined |= bool(ex10_var_extractor(path, index=index)["undefined"])
+            print()
+        return 1 if undefined else 0
+    elif args.command == "snapshot":
+        store = InventorySnapshotStore(
+            os.path.join(args.cache_dir, "snapshots") if args.cache_dir else None, keep=args.keep)
+        current = store.commit_file(args.inventory)
+        ids = [e["id"] for e in store.history]
+        base = max(i for i, snapshot_id in enumerate(ids) if snapshot_id == current) - args.against
+        print(f"Snapshot {current[:12]} ({len(ids)} kept)")
+        if base < 0:
+            print("No earlier snapshot to compare with")
+        else:
+            changes = 0
+            for entry in store.diff(ids[base], current):
+                changes += 1
+                print(f"  {entry.kind:<14} {entry.name}"
+                      + (f": {', '.join(entry.detail)}" if entry.detail else ""))
+            print(f"{changes} change(s) since {ids[base][:12]}")
+    elif args.command == "import-time":
+        return 0 if bench_import_time(budget_ms=args.budget_ms)["ok"] else 1
     elif args.command == "generate":
         ex02_generate_playbook(hosts=args.hosts, output_file=args.output)
     elif args.command == "scaffold":
         ex11_role_scaffold(args.role_name)
     elif args.command == "inventory":
-        if args.host:
-            ex05_dynamic_inventory(["--host", args.host])
-        else:
-            ex05_dynamic_inventory(["--list"])
+        source = inventory_source(args.source)
+        inv_args = ["--host", args.host] if args.host else ["--list"]
+        ex05_dynamic_inventory(inv_args, source=source, cache_ttl=args.ttl,
+                               cache_dir=args.cache_dir)
+    elif args.command == "prune-cache":
+        max_bytes = None if args.max_size_mb is None else int(args.max_size_mb * 1024 * 1024)
+        cache = DiskParseCache(args.cache_dir)
+        removed = cache.prune(max_age_days=args.max_age_days, max_bytes=max_bytes)
+        print(f"Removed {removed} cache entries from {cache.directory}")
     else:
         parser.print_help()
+    return 0
+
+
+# =============================================================================
+# Benchmarks
+# =============================================================================
+
+def _synthetic_inventory(n_hosts: int = 40000, n_groups: int = 200) -> dict:
+    """Build an inventory shaped like a large production one."""
+    children = {}
+    for g in range(n_groups):
+        hosts = {
+            f"host{h:06d}.example.com": {
+                "ansible_host": f"10.{h // 65536}.{h // 256 % 256}.{h % 256}",
+                "rack": f"r{h % 40}",
+            }
+            for h in range(g, n_hosts, n_groups)
+        }
+        children[f"group{g:03d}"] = {"hosts": hosts, "vars": {"tier": g % 3}}
+    return {"all": {"children": children}}
+
+
+def bench_yaml_backends(n_hosts: int = 40000, repeat: int = 3) -> dict:
+    """
+    Compare load/dump throughput of the pure-Python and libyaml backends
+    on a synthetic inventory. Returns MB/s per backend and operation.
+    """
+    import time
+
+    if not yaml:
+        raise ImportError("pyyaml required: pip install pyyaml")
+
+    backends = {"python": (yaml.SafeLoader, yaml.SafeDumper)}
+    if hasattr(yaml, 'CSafeLoader'):
+        backends["libyaml"] = (yaml.CSafeLoader, yaml.CSafeDumper)
+
+    inventory = _synthetic_inventory(n_hosts)
+    text = yaml.dump(inventory, Dumper=_safe_dumper(), sort_keys=False)
+    size_mb = len(text.encode()) / 1e6
+
+    def best_of(func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    results = {}
+    for name, (loader, dumper) in backends.items():
+        load = best_of(lambda: yaml.load(text, Loader=loader))
+        dump = best_of(lambda: yaml.dump(inventory, Dumper=dumper, sort_keys=False))
+        results[name] = {"load_mb_s": size_mb / load, "dump_mb_s": size_mb / dump}
+
+    print(f"YAML backends on {n_hosts} hosts ({size_mb:.1f} MB), active: {yaml_backend()}")
+    print("-" * 40)
+    for name, r in results.items():
+        print(f"  {name:8} load {r['load_mb_s']:6.2f} MB/s   dump {r['dump_mb_s']:6.2f} MB/s")
+    if "libyaml" in results:
+        speedup = results["libyaml"]["load_mb_s"] / results["python"]["load_mb_s"]
+        print(f"  libyaml load speedup: {speedup:.1f}x")
+
+    return results
+
+
+def bench_import_time(budget_ms: float = None, repeat: int = 3) -> dict:
+    """
+    Measure the cost of importing this module in a fresh interpreter with
+    ``python -X importtime`` (best of ``repeat`` runs) and list the
+    slowest imports. The budget defaults to $ANSIBLE_HELPER_IMPORT_BUDGET_MS;
+    the result's "ok" is False when the import exceeds it.
+    """
+    import subprocess
+    from pathlib import Path
+
+    module = Path(__file__).stem
+    if budget_ms is None and os.environ.get("ANSIBLE_HELPER_IMPORT_BUDGET_MS"):
+        budget_ms = float(os.environ["ANSIBLE_HELPER_IMPORT_BUDGET_MS"])
+
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=str(Path(__file__).resolve().parent),
+            capture_output=True, text=True,
+        )
+        timings = []
+        total_us = None
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            name = name.strip()
+            timings.append((int(self_us), name))
+            if name == module:
+                total_us = int(cumulative_us)
+        if total_us is None:
+            raise RuntimeError(f"could not import {module}: {proc.stderr.strip()[-200:]}")
+        if best is None or total_us < best[0]:
+            best = (total_us, timings)
+
+    total_ms = best[0] / 1000
+    top = [(name, us / 1000) for us, name in sorted(best[1], reverse=True)[:8]]
+    ok = budget_ms is None or total_ms <= budget_ms
+
+    print(f"Import time for {module}: {total_ms:.1f} ms"
+          + (f" (budget {budget_ms:.1f} ms: {'OK' if ok else 'OVER'})" if budget_ms is not None else ""))
+    print("-" * 40)
+    for name, ms in top:
+        print(f"  {ms:7.2f} ms  {name}")
+
+    return {"total_ms": total_ms, "top": top, "budget_ms": budget_ms, "ok": ok}
+
+
+def bench_dynamic_inventory(n_hosts: int = 100000, budget_ms: float = 1000.0,
+                            repeat: int = 3) -> dict:
+    """
+    Time ex05_dynamic_inventory at scale for each source type.
+
+    Builds a synthetic inventory of ``n_hosts`` and serves it as a YAML
+    file, a SQLite database and a local HTTP endpoint. For each source it
+    measures a cold --list (source read plus cache refresh), a warm --list
+    served from the cache and a --host lookup (best of ``repeat``). "ok"
+    is False if any warm --list or --host call exceeds ``budget_ms``.
+    """
+    import contextlib
+    import http.server
+    import tempfile
+    import threading
+    import time
+
+    inventory = CompiledInventory(_synthetic_inventory(n_hosts)).to_script_json()
+    payload = _dumps_compact(inventory)
+    probe_host = next(iter(inventory["_meta"]["hostvars"]))
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    def timed(args, source, cache_dir):
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            ex05_dynamic_inventory(args, source=source, cache_dir=cache_dir, cache_ttl=3600)
+        return (time.perf_counter() - start) * 1000
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            yaml_path = os.path.join(tmp, "inventory.yml")
+            with open(yaml_path, 'w') as f:
+                yaml_dump(_synthetic_inventory(n_hosts), f)
+            sources = {
+                "yaml": YamlInventorySource(yaml_path),
+                "sqlite": SqliteInventorySource.create(os.path.join(tmp, "inventory.db"), inventory),
+                "http": HttpInventorySource(f"http://127.0.0.1:{server.server_address[1]}/"),
+            }
+            cache_dir = os.path.join(tmp, "cache")
+            for name, source in sources.items():
+                cold = timed(["--list"], source, cache_dir)
+                warm = min(timed(["--list"], source, cache_dir) for _ in range(repeat))
+                host = min(timed(["--host", probe_host], source, cache_dir) for _ in range(repeat))
+                results[name] = {"cold_list_ms": cold, "warm_list_ms": warm, "host_ms": host}
+    finally:
+        server.shutdown()
+        thread.join()
+
+    ok = all(r["warm_list_ms"] <= budget_ms and r["host_ms"] <= budget_ms
+             for r in results.values())
+    print(f"Dynamic inventory, {n_hosts} hosts, {len(payload) / 1e6:.1f} MB --list payload "
+          f"({'orjson' if orjson else 'json'}; budget {budget_ms:.0f} ms: {'OK' if ok else 'OVER'})")
+    print("-" * 40)
+    for name, r in results.items():
+        print(f"  {name:<7} cold --list {r['cold_list_ms']:8.1f} ms  "
+              f"warm --list {r['warm_list_ms']:7.1f} ms  --host {r['host_ms']:6.1f} ms")
+
+    return {"hosts": n_hosts, "payload_bytes": len(payload), "budget_ms": budget_ms,
+            "ok": ok, "sources": results}
+
+
+def bench_connection_tester(n_hosts: int = 2000, concurrency: int = 500,
+                            timeout: float = 1.0) -> dict:
+    """
+    Run ex18_connection_tester against local stand-in listeners.
+
+    Starts three listeners on 127.0.0.1 in a background thread: one sends
+    an SSH banner, one accepts and stays silent (probes time out) and one
+    port is closed (connections are refused). Hosts in a temporary
+    inventory point at them through ansible_host/ansible_port, 90% at the
+    SSH listener and 5% at each of the others.
+    """
+    import asyncio
+    import socket
+    import tempfile
+    import threading
+
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    ports = {}
+
+    async def ssh(reader, writer):
+        writer.write(b"SSH-2.0-OpenSSH_9.6 bench\r\n")
+        await writer.drain()
+        writer.close()
+
+    async def silent(reader, writer):
+        await reader.read()
+        writer.close()
+
+    async def start():
+        for name, handler in (("ssh", ssh), ("silent", silent)):
+            server = await asyncio.start_server(handler, "127.0.0.1", 0, backlog=4096)
+            ports[name] = server.sockets[0].getsockname()[1]
+        ready.set()
+
+    # A port that was just free is, for practical purposes, closed
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        ports["closed"] = s.getsockname()[1]
+
+    thread = threading.Thread(target=lambda: (loop.run_until_complete(start()), loop.run_forever()),
+                              daemon=True)
+    thread.start()
+    ready.wait()
+
+    hosts = {}
+    for i in range(n_hosts):
+        kind = "closed" if i % 20 == 0 else "silent" if i % 20 == 1 else "ssh"
+        hosts[f"host{i:06d}.example.com"] = {"ansible_host": "127.0.0.1",
+                                             "ansible_port": ports[kind]}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            inventory_path = os.path.join(tmp, "inventory.yml")
+            with open(inventory_path, 'w') as f:
+                yaml_dump({"all": {"hosts": hosts}}, f)
+            result = ex18_connection_tester(inventory_path, concurrency=concurrency,
+                                            timeout=timeout, verbose=False)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    rate = n_hosts / result["seconds"]
+    print(f"Probed {n_hosts} hosts in {result['seconds']:.2f}s ({rate:.0f} hosts/s): "
+          f"{len(result['reachable'])} reachable, {len(result['unreachable'])} unreachable")
+    _print_histogram(result["histogram"])
+    return {"hosts": n_hosts, "seconds": result["seconds"], "hosts_per_second": rate,
+            "reachable": len(result["reachable"]), "unreachable": len(result["unreachable"])}
 
 
 # =============================================================================
@@ -1123,6 +5066,9 @@ def ex20_cli():
 # =============================================================================
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(ex20_cli())
+    
     print("=" * 60)
     print("Ansible + Python Exercises - Solutions")
     print("=" * 60)
@@ -1130,23 +5076,30 @@ if __name__ == "__main__":
     print("  ex01_parse_inventory(filepath)")
     print("  ex02_generate_playbook(hosts, task_name, module, ...)")
     print("  ex03_jinja_render(template_string, variables)")
+    print("  ex03_render_batch(template_string, variables_list)")
+    print("  render_inventory(inventory_path, template_string, output_dir)")
     print("  ex04_yaml_validator(filepath)")
-    print("  ex05_dynamic_inventory(args)")
+    print("  ex05_dynamic_inventory(args, source)")
     print("  ex06_run_playbook(playbook_path, inventory_path)")
     print("  ex07_facts_collector(host)")
-    print("  ex08_inventory_diff(file1, file2)")
+    print("  ex08_inventory_diff(file1, file2, snapshot)")
     print("  ex09_task_counter(playbook_path)")
-    print("  ex10_var_extractor(playbook_path)")
+    print("  ex10_var_extractor(playbook_path, index)")
     print("  ex11_role_scaffold(role_name)")
     print("  ex12_vault_helper(action, filepath, password)")
     print("  ex13_playbook_linter(playbook_path)")
-    print("  ex14_report_generator(results, output_file)")
+    print("  ex14_report_generator(results, output_file, jsonl_file, csv_file)")
+    print("  RunStatsStore(directory).add_run(stats)")
     print("  ex15_pattern_matcher(inventory, pattern)")
     print("  ex16_module_docs(module_name)")
     print("  ex17_playbook_merger(playbook_files, output_file)")
-    print("  ex18_connection_tester(inventory_path)")
+    print("  ex18_connection_tester(inventory_path, method)")
     print("  ex19_config_generator(...)")
     print("  ex20_cli()")
+    print("  bench_yaml_backends(n_hosts, repeat)")
+    print("  bench_import_time(budget_ms)")
+    print("  bench_connection_tester(n_hosts)")
+    print("  bench_dynamic_inventory(n_hosts, budget_ms)")
     print("\nRun individual exercises by importing this module:")
     print("  from ansible_python_solutions import ex01_parse_inventory")
     print("\nOr run the CLI:")